@@ -15,146 +15,556 @@
 
 import os
 import json
+import mmap
+import operator
 import sys
 import urllib.parse
-import urllib.request
 import requests
 import copy
+import abc
+import contextlib
+import gc
+import hashlib
+import io
+import itertools
+import multiprocessing
+import random
 import re
 import shutil
-from pathlib import Path
+import sqlite3
+import struct
+import tarfile
+import threading
+import time
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from argparse import ArgumentParser
+from collections import OrderedDict
+from array import array
+from requests.adapters import HTTPAdapter
 
 from defcon import Font
 from fontTools import ttLib
+from fontTools import version as fontToolsVersion
 from fontTools.subset import Subsetter
 from fontTools.subset import Options
 from fontTools import merge
 from fontTools.ttLib.tables._n_a_m_e import makeName
 from fontTools.ttLib.tables._c_m_a_p import CmapSubtable
+from fontTools.unicodedata import Blocks
 
 from third_party.scalefonts import scale_font
 
 
+class HttpClient:
+    """ One pooled, keep-alive HTTP session shared by all the requests
+        made by Download. Transient failures (connection errors, 429 and
+        5xx answers) are retried with a jittered exponential backoff.
+    """
 
-class Download:
-    def __init__(self, repo_names, scriptsFolder, hinted=False):
-        self.repoNames = repo_names
-        self.notoFontsFolder = os.path.join(scriptsFolder, "NotoFonts")
-        if not os.path.exists(self.notoFontsFolder):
-                os.makedirs(self.notoFontsFolder)
-        self.hinted = hinted
-        self.editedRepoNames = copy.deepcopy(repo_names)
+    retryStatuses = [429, 500, 502, 503, 504]
+
+    def __init__(self, poolSize=8, retries=4, backoff=0.5, timeout=30):
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=poolSize, pool_maxsize=poolSize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.lock = threading.Lock()
+        self.requestCount = 0
+        self.retryCount = 0
+        self.bytesReceived = 0
+
+    def count(self, requests=0, retries=0, received=0):
+        with self.lock:
+            self.requestCount += requests
+            self.retryCount += retries
+            self.bytesReceived += received
+
+    def sleep(self, attempt, response=None):
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        if response is not None and "Retry-After" in response.headers:
+            try:
+                delay = max(delay, float(response.headers["Retry-After"]))
+            except ValueError:
+                pass
+        time.sleep(delay)
+
+    def request(self, method, url, stream=False, **kwargs):
+        """ Send a request, retrying on transient errors. The last
+            response is returned whatever its status code.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.retries + 1):
+            self.count(requests=1)
+            try:
+                response = self.session.request(method, url, stream=stream, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.retries:
+                    raise
+                self.count(retries=1)
+                self.sleep(attempt)
+                continue
+            if response.status_code in self.retryStatuses and attempt < self.retries:
+                response.close()
+                self.count(retries=1)
+                self.sleep(attempt, response)
+                continue
+            if stream is False:
+                self.count(received=len(response.content))
+            return response
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def getJson(self, url, **kwargs):
+        response = self.get(url, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.session.close()
+
+    def iterContent(self, response, chunkSize=1 << 16):
+        for chunk in response.iter_content(chunk_size=chunkSize):
+            self.count(received=len(chunk))
+            yield chunk
+
+    def stats(self):
+        with self.lock:
+            return {
+                "requests": self.requestCount,
+                "retries": self.retryCount,
+                "bytes": self.bytesReceived,
+            }
 
-    def oldSha(self, repoName):
-        oldShaPath = os.path.join(self.notoFontsFolder, repoName, "sha.md")
-        with open(oldShaPath, "r") as text:
-            _oldSha = text.read()
-        return _oldSha
 
-    def getSha(self, repoName):
-        if self.hinted is False:
-            folder_url = (
-                "https://api.github.com/repos/notofonts/"
+class BlobStore:
+    """ Content-addressed store of the downloaded fonts, keyed by their
+        git blob SHA (the "sha" given by the GitHub contents API).
+        A blob shared by several repositories or trees is stored once
+        and hardlinked where it is needed.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+
+    def path(self, sha):
+        return os.path.join(self.folder, sha[:2], sha[2:])
+
+    def has(self, sha):
+        return os.path.isfile(self.path(sha))
+
+    @staticmethod
+    def hasher(size):
+        h = hashlib.sha1()
+        h.update(b"blob " + str(size).encode("ascii") + b"\0")
+        return h
+
+    @classmethod
+    def hashBytes(cls, data):
+        h = cls.hasher(len(data))
+        h.update(data)
+        return h.hexdigest()
+
+    @classmethod
+    def hashFile(cls, path):
+        h = cls.hasher(os.path.getsize(path))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def partPath(self, sha):
+        return self.path(sha) + ".part"
+
+    def partSize(self, sha):
+        if os.path.exists(self.partPath(sha)):
+            return os.path.getsize(self.partPath(sha))
+        return 0
+
+    def write(self, sha, size, chunks, offset=0):
+        """ Stream the chunks into the partial blob, from offset when an
+            interrupted download is resumed. The git blob hash is checked
+            on the fly, then the blob is atomically moved into place.
+        """
+        part = self.partPath(sha)
+        os.makedirs(os.path.dirname(part), exist_ok=True)
+        h = self.hasher(size)
+        if offset > 0:
+            with open(part, "rb") as f:
+                for chunk in iter(lambda: f.read(min(1 << 16, offset - f.tell())), b""):
+                    h.update(chunk)
+            mode = "r+b"
+        else:
+            mode = "wb"
+        with open(part, mode) as f:
+            f.seek(offset)
+            f.truncate()
+            for chunk in chunks:
+                h.update(chunk)
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        if h.hexdigest() != sha:
+            os.remove(part)
+            raise ValueError("Blob " + sha + " is corrupted (got " + h.hexdigest() + ")")
+        os.replace(part, self.path(sha))
+        return self.path(sha)
+
+    @staticmethod
+    def clone(src, dest, hardlink=True):
+        """ Zero-copy when possible: hardlink (if allowed), then reflink
+            (FICLONE on Linux), then a plain copy.
+        """
+        if hardlink is True:
+            try:
+                os.link(src, dest)
+                return
+            except OSError:
+                pass
+        try:
+            import fcntl
+            with open(src, "rb") as s, open(dest, "wb") as d:
+                fcntl.ioctl(d.fileno(), 0x40049409, s.fileno())  # FICLONE
+            return
+        except (ImportError, OSError):
+            if os.path.exists(dest):
+                os.remove(dest)
+        shutil.copyfile(src, dest)
+
+    def adopt(self, sha, src):
+        """ Put a local file in the store, reflinked or copied: a
+            hardlink would change the blob when the file is edited in
+            place. The copy is checked against sha.
+        """
+        if self.has(sha):
+            return self.path(sha)
+        part = self.partPath(sha)
+        os.makedirs(os.path.dirname(part), exist_ok=True)
+        if os.path.exists(part):
+            os.remove(part)
+        self.clone(src, part, hardlink=False)
+        if self.hashFile(part) != sha:
+            os.remove(part)
+            raise ValueError("Blob " + sha + " changed while it was copied from " + src)
+        os.replace(part, self.path(sha))
+        return self.path(sha)
+
+    def link(self, sha, dest):
+        """ Make dest point to the blob, with a hardlink if possible.
+        """
+        blob = self.path(sha)
+        if os.path.exists(dest) and os.path.samefile(blob, dest):
+            return dest
+        tmp = dest + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        self.clone(blob, tmp)
+        os.replace(tmp, dest)
+        return dest
+
+
+def sfntGlyphCount(read):
+    """ numGlyphs of the maxp table of a font, read(offset, length)
+        giving the bytes of the file: only the table directory and maxp
+        are read.
+    """
+    header = read(0, 16)
+    offset = 0
+    if header[:4] == b"ttcf" and len(header) == 16:
+        offset = struct.unpack(">L", header[12:16])[0]
+        header = read(offset, 12)
+    if len(header) < 12 or header[:4] not in (b"\x00\x01\x00\x00", b"OTTO", b"true"):
+        raise ValueError("not an sfnt font")
+    numTables = struct.unpack(">H", header[4:6])[0]
+    directory = read(offset + 12, 16 * numTables)
+    if len(directory) != 16 * numTables:
+        raise ValueError("truncated table directory")
+    for i in range(numTables):
+        tag, _, tableOffset, length = struct.unpack_from(">4sLLL", directory, 16 * i)
+        if tag == b"maxp":
+            maxp = read(tableOffset + 4, 2)
+            if len(maxp) != 2:
+                raise ValueError("truncated maxp table")
+            return struct.unpack(">H", maxp)[0]
+    raise ValueError("no maxp table")
+
+
+class FontSource(abc.ABC):
+    """ Where the Noto fonts come from. A source lists the instances of
+        a repository and puts their blobs in the BlobStore.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fileCount = 0
+        self.byteCount = 0
+
+    @staticmethod
+    def fromSpec(spec, notoFontsFolder, jobs=8):
+        """ github (default), mirror:<folder>, archive:<zip or tar file>
+            or an http(s)://host:port URL of a MirrorServer.
+        """
+        if spec is None or spec == "github":
+            return GitHubSource(notoFontsFolder, HttpClient(poolSize=jobs))
+        if spec.startswith("mirror:"):
+            return LocalMirrorSource(spec[len("mirror:"):], notoFontsFolder)
+        if spec.startswith("archive:"):
+            return ArchiveSource(spec[len("archive:"):], notoFontsFolder)
+        if spec.startswith("http://") or spec.startswith("https://"):
+            return GitHubSource(
+                notoFontsFolder, HttpClient(poolSize=jobs),
+                apiUrl=spec.rstrip("/"), rawUrl=spec.rstrip("/")
+                )
+        raise ValueError("Unknown font source: " + spec)
+
+    @abc.abstractmethod
+    def listing(self, repoName, fontsPath):
+        """ Return {"sha": <sha of the fontsPath folder>, "files":
+            [(name, blob sha, size, locator), …]}, or None if the
+            repository does not exist.
+        """
+
+    @abc.abstractmethod
+    def fetch(self, locator, sha, size, blobs):
+        """ Put one blob in the store and return its path.
+        """
+
+    @abc.abstractmethod
+    def repositories(self):
+        """ Names of all the Noto repositories of the source.
+        """
+
+    @abc.abstractmethod
+    def glyphCount(self, locator, sha, size):
+        """ The glyph count of a blob, without fetching all of it.
+        """
+
+    @staticmethod
+    def fileGlyphCount(path):
+        with open(path, "rb") as f:
+            def read(offset, length):
+                f.seek(offset)
+                return f.read(length)
+            return sfntGlyphCount(read)
+
+    def close(self):
+        """ Release the connections of the source.
+        """
+
+    def fetchAll(self, blobs, pool, items):
+        """ Start fetching the (locator, sha, size) items, each in a
+            thread of pool. Returns {sha: future}.
+        """
+        return {
+            sha: pool.submit(self.fetch, locator, sha, size, blobs)
+            for locator, sha, size in items
+            }
+
+    def count(self, files=0, size=0):
+        with self.lock:
+            self.fileCount += files
+            self.byteCount += size
+
+    def stats(self):
+        with self.lock:
+            return {"requests": 0, "retries": 0, "files": self.fileCount,
+                "bytes": self.byteCount}
+
+    @staticmethod
+    def treeSha(files):
+        """ Git tree hash of a flat folder of regular files.
+        """
+        entries = b""
+        for name, sha, size, locator in sorted(files, key=lambda f: f[0].encode("utf-8")):
+            entries += b"100644 " + name.encode("utf-8") + b"\0" + bytes.fromhex(sha)
+        h = hashlib.sha1(b"tree " + str(len(entries)).encode("ascii") + b"\0")
+        h.update(entries)
+        return h.hexdigest()
+
+
+class GitHubSource(FontSource):
+    """ The notofonts organisation on GitHub, or any server speaking the
+        same git trees / raw files protocol (see MirrorServer).
+    """
+
+    def __init__(self, notoFontsFolder, client,
+                apiUrl="https://api.github.com",
+                rawUrl="https://raw.githubusercontent.com"):
+        super().__init__()
+        self.client = client
+        self.apiUrl = apiUrl
+        self.rawUrl = rawUrl
+        self.metadataFolder = os.path.join(notoFontsFolder, "metadata")
+        if apiUrl != "https://api.github.com":
+            host = urllib.parse.urlsplit(apiUrl).netloc.replace(":", "_")
+            self.metadataFolder = os.path.join(self.metadataFolder, host)
+        if not os.path.exists(self.metadataFolder):
+            os.makedirs(self.metadataFolder, exist_ok=True)
+
+    def fetchTree(self, repoName):
+        """ Get the recursive git tree of a repository in a single call.
+            The answer is cached in NotoFonts/metadata with its ETag, so
+            an unchanged repository only costs a 304 (which does not
+            count in the GitHub rate limit).
+            Returns None if the repository does not exist.
+        """
+        cachePath = os.path.join(self.metadataFolder, repoName + ".json")
+        cached = None
+        headers = {}
+        if os.path.exists(cachePath):
+            with open(cachePath, "r") as f:
+                cached = json.load(f)
+            headers["If-None-Match"] = cached["etag"]
+        response = self.client.get(
+            self.apiUrl
+            + "/repos/notofonts/"
+            + repoName
+            + "/git/trees/master?recursive=1",
+            headers=headers
+            )
+        if response.status_code == 304:
+            return cached
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        data = response.json()
+        tree = {
+            "etag": response.headers.get("ETag", ""),
+            "truncated": data.get("truncated", False),
+            # sources are not needed, only keep the binaries
+            "tree": [t for t in data["tree"] if t["path"].startswith("fonts/")],
+        }
+        with open(cachePath + ".tmp", "w") as f:
+            json.dump(tree, f)
+        os.replace(cachePath + ".tmp", cachePath)
+        return tree
+
+    def listing(self, repoName, fontsPath):
+        tree = self.fetchTree(repoName)
+        if tree is None:
+            return None
+        if tree["truncated"] is True:
+            # too big for the trees endpoint, list the folder instead
+            url = (
+                "https://github.com/notofonts/"
                 + repoName
-                + "/tree/master/fonts/ttf/unhinted"
+                + "/tree/master/"
+                + fontsPath
             )
+            entries = [
+                {"path": fontsPath + "/" + f["name"], "type": f["type"],
+                "sha": f["sha"], "size": f["size"]}
+                for f in self.client.getJson(self.createUrl(url))
+                ]
         else:
-            folder_url = (
-                "https://api.github.com/repos/notofonts/"
+            entries = tree["tree"]
+        sha = None
+        for entry in tree["tree"]:
+            if entry["path"] == fontsPath:
+                sha = entry["sha"]
+        files = []
+        for entry in entries:
+            if entry["type"] != "blob":
+                continue
+            if os.path.dirname(entry["path"]) != fontsPath:
+                continue
+            file_url = (
+                self.rawUrl
+                + "/notofonts/"
                 + repoName
-                + "/tree/master/fonts/ttf/hinted"
+                + "/master/"
+                + urllib.parse.quote(entry["path"])
             )
-        api_url = self.createUrl(folder_url)
-        response = urllib.request.urlretrieve(api_url)
-        with open(response[0], "r") as content:
-            data = json.loads(content.read())
-            for index, file in enumerate(data):
-                if file["name"] == "instance_ttf":
-                    self.sha = file["sha"]
-        return self.sha
-        # if response.getcode() != 404
-        # elif response.getcode() == 404:
-        #     print("Too much Gituh Requests.")
-
-    def writeSha(self, repoName):
-        shaTxt = os.path.join(self.notoFontsFolder, repoName, "sha.md")
-        with open(shaTxt, "w") as text:
-            text.write(self.sha)
-
-    def dwnldFonts(self):
-        for i in self.repoNames:
-            if self.hinted is False:
-                url = (
-                    "https://api.github.com/repos/notofonts/"
-                    + i
-                    + "/tree/master/fonts/ttf/unhinted/instance_ttf"
-                )
+            files.append((
+                os.path.basename(entry["path"]), entry["sha"], entry["size"], file_url
+                ))
+        if sha is None and len(files) > 0:
+            sha = self.treeSha(files)
+        return {"sha": sha, "files": files}
+
+    def fetch(self, file_url, sha, size, blobs):
+        """ Stream a blob into the store. After a network failure, the
+            download resumes where it stopped with a Range request.
+        """
+        for attempt in range(self.client.retries + 1):
+            offset = blobs.partSize(sha)
+            headers = {}
+            if 0 < offset < size:
+                headers["Range"] = "bytes=" + str(offset) + "-"
             else:
-                url = (
-                    "https://api.github.com/repos/notofonts/"
-                    + i
-                    + "/tree/master/fonts/ttf/hinted/instance_ttf"
-                )
+                offset = 0
             try:
-                r = urllib.request.urlretrieve("https://github.com/notofonts/" + i)
-                api_url = self.createUrl(url)
-            except:
-                try:
-                    askedByUser = i
-                    i = i.replace("Serif", "Sans")
-                    url = url.replace("Serif", "Sans")
-                    r = urllib.request.urlretrieve("https://github.com/notofonts/" + i)
-                    for z in range(len(self.editedRepoNames)):
-                        if self.editedRepoNames[z] == askedByUser:
-                            self.editedRepoNames[z] = i
-                    api_url = self.createUrl(url)
-                except:
-                    print(i.replace("Sans", "Serif"), "does not exist." +
-                            "Removed from writing system list"
-                            )
-                    self.editedRepoNames.remove(askedByUser)
-                    continue
-            # CHECK SHA
-            dlBool = True
-            if os.path.exists(os.path.join(self.notoFontsFolder, i)):
-                # print(">>> ", self.oldSha(i), self.getSha(i))
-                if self.oldSha(i) == self.getSha(i):
-                    dlBool = False
-                else:
-                    print("else")
-                    dlBool = True
-            if dlBool is True:
-                print("INFO: "+i+" download begin")
-                dest = self.getFilepathFromUrl(url, self.notoFontsFolder)
-                dest = os.path.join(os.path.dirname(dest), i, "instance_ttf")
-                if not os.path.exists(dest):
-                    os.makedirs(dest)
-                response = urllib.request.urlretrieve(api_url)
-                with open(response[0], "r") as f:
-                    data_brutes = f.read()
-                    data = json.loads(data_brutes)
-                    for index, file in enumerate(data):
-                        file_url = file["download_url"]
-                        file_name = file["name"]
-                        temp_path = os.path.join(dest, file_url.split(
-                            "/")[-1]).replace("%20", " "
-                                )
-                        if file_url is not None:
-                            with requests.get(file_url) as response:
-                                binary = response.content
-                                self.writeBin(temp_path, binary)
-                self.getSha(i)
-                self.writeSha(i)
-
-    def writeBin(self, path, binary):
-        with open(path, "wb") as f:
-            f.write(binary)
+                with self.client.get(file_url, stream=True, headers=headers) as response:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        offset = 0  # range ignored, start again
+                    path = blobs.write(
+                        sha, size, self.client.iterContent(response), offset
+                        )
+                self.count(files=1, size=size)
+                return path
+            except (requests.ConnectionError,
+                    requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError):
+                if attempt == self.client.retries:
+                    raise
+                self.client.sleep(attempt)
+
+    def glyphCount(self, file_url, sha, size):
+        """ Read maxp with Range requests: the table directory and maxp
+            are usually in the first kilobytes, one request is enough.
+        """
+        head = self.readRange(file_url, 0, 4096)
+
+        def read(offset, length):
+            if offset + length <= len(head):
+                return head[offset:offset + length]
+            return self.readRange(file_url, offset, length)
+
+        return sfntGlyphCount(read)
+
+    def readRange(self, file_url, offset, length):
+        response = self.client.get(file_url, headers={
+            "Range": "bytes=" + str(offset) + "-" + str(offset + length - 1)
+            })
+        response.raise_for_status()
+        if response.status_code != 206:
+            # range ignored, the whole file came
+            return response.content[offset:offset + length]
+        return response.content
+
+    def repositories(self):
+        names = []
+        page = 1
+        while True:
+            repos = self.client.getJson(
+                self.apiUrl + "/orgs/notofonts/repos?per_page=100&page=" + str(page)
+                )
+            if len(repos) == 0:
+                break
+            names += [r["name"] for r in repos if r["name"].startswith("Noto")]
+            page += 1
+        return sorted(names)
+
+    def stats(self):
+        stats = super().stats()
+        stats.update(self.client.stats())
+        return stats
+
+    def close(self):
+        self.client.close()
 
     def createUrl(self, url):
         branch = re.findall(r"/tree/(.*?)/", url)
         api_url = url.replace("https://github.com",
-                            "https://api.github.com/repos"
+                            self.apiUrl + "/repos"
                             )
         if len(branch) == 0:
             branch = re.findall(r"/blob/(.*?)/", url)[0]
@@ -166,16 +576,1929 @@ class Download:
         api_url = api_url + "?ref=" + branch
         return api_url
 
-    def getFilepathFromUrl(self, url, dirpath):
-        url_path_list = urllib.parse.urlsplit(url)
-        abs_filepath = url_path_list.path
-        basepath = os.path.split(abs_filepath)[-1].split("-")[0]
 
-        return os.path.join(dirpath, basepath)
+class LocalMirrorSource(FontSource):
+    """ A folder of notofonts checkouts: <folder>/<repo>/fonts/ttf/….
+        Blobs are reflinked from the mirror when the filesystem allows
+        it, copied otherwise.
+    """
+
+    def __init__(self, folder, notoFontsFolder):
+        super().__init__()
+        self.folder = os.path.abspath(folder)
+        self.hashCachePath = os.path.join(notoFontsFolder, "metadata", "mirror-hashes.json")
+        self.hashCache = dict()
+        if os.path.exists(self.hashCachePath):
+            with open(self.hashCachePath, "r") as f:
+                self.hashCache = json.load(f)
+
+    def blobSha(self, path):
+        """ Hash of a mirror file, cached by size and mtime.
+        """
+        st = os.stat(path)
+        key = path + ":" + str(st.st_size) + ":" + str(st.st_mtime_ns)
+        with self.lock:
+            if key in self.hashCache:
+                return self.hashCache[key]
+        sha = BlobStore.hashFile(path)
+        with self.lock:
+            self.hashCache[key] = sha
+        return sha
+
+    def saveHashCache(self):
+        os.makedirs(os.path.dirname(self.hashCachePath), exist_ok=True)
+        with self.lock:
+            tmp = self.hashCachePath + "." + str(threading.get_ident()) + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.hashCache, f)
+            os.replace(tmp, self.hashCachePath)
+
+    def listing(self, repoName, fontsPath):
+        if not os.path.isdir(os.path.join(self.folder, repoName)):
+            return None
+        folder = os.path.join(self.folder, repoName, *fontsPath.split("/"))
+        files = []
+        if os.path.isdir(folder):
+            for name in sorted(os.listdir(folder)):
+                path = os.path.join(folder, name)
+                if os.path.isfile(path):
+                    files.append((name, self.blobSha(path), os.path.getsize(path), path))
+        self.saveHashCache()
+        return {"sha": self.treeSha(files), "files": files}
+
+    def fetch(self, path, sha, size, blobs):
+        self.count(files=1, size=size)
+        return blobs.adopt(sha, path)
+
+    def glyphCount(self, path, sha, size):
+        return self.fileGlyphCount(path)
+
+    def repositories(self):
+        return sorted(
+            r for r in os.listdir(self.folder)
+            if r.startswith("Noto") and os.path.isdir(os.path.join(self.folder, r))
+            )
+
+
+class ArchiveSource(FontSource):
+    """ A zip or tar archive of notofonts checkouts. The repository
+        folders can be named <repo> or <repo>-<branch> (GitHub archives),
+        at any depth.
+    """
+
+    def __init__(self, archivePath, notoFontsFolder):
+        super().__init__()
+        self.archivePath = os.path.abspath(archivePath)
+        st = os.stat(self.archivePath)
+        self.hashCachePath = os.path.join(
+            notoFontsFolder, "metadata",
+            "archive-" + os.path.basename(self.archivePath) + "-"
+            + str(st.st_size) + "-" + str(st.st_mtime_ns) + ".json"
+            )
+        self.members = None
+
+    def open(self):
+        if zipfile.is_zipfile(self.archivePath):
+            return zipfile.ZipFile(self.archivePath)
+        return tarfile.open(self.archivePath)
+
+    def readMember(self, archive, name):
+        if isinstance(archive, zipfile.ZipFile):
+            return archive.open(name)
+        return archive.extractfile(name)
+
+    def memberNames(self, archive):
+        if isinstance(archive, zipfile.ZipFile):
+            return [i.filename for i in archive.infolist() if not i.is_dir()]
+        return [i.name for i in archive.getmembers() if i.isfile()]
+
+    def indexMembers(self):
+        """ Hash and count the glyphs of every font of the archive once:
+            {name: [sha, size, glyph count]}, cached next to the download
+            metadata.
+        """
+        with self.lock:
+            if self.members is not None:
+                return self.members
+            if os.path.exists(self.hashCachePath):
+                with open(self.hashCachePath, "r") as f:
+                    self.members = json.load(f)
+                if all(len(m) == 3 for m in self.members.values()):
+                    return self.members
+            self.members = dict()
+            with self.open() as archive:
+                for name in self.memberNames(archive):
+                    if "/fonts/" not in "/" + name:
+                        continue
+                    with self.readMember(archive, name) as member:
+                        data = member.read()
+                    h = BlobStore.hasher(len(data))
+                    h.update(data)
+                    try:
+                        glyphs = sfntGlyphCount(lambda offset, length: data[offset:offset + length])
+                    except ValueError:
+                        glyphs = None
+                    self.members[name] = [h.hexdigest(), len(data), glyphs]
+            os.makedirs(os.path.dirname(self.hashCachePath), exist_ok=True)
+            with open(self.hashCachePath, "w") as f:
+                json.dump(self.members, f)
+            return self.members
+
+    def listing(self, repoName, fontsPath):
+        members = self.indexMembers()
+        files = []
+        found = False
+        for name in sorted(members):
+            parts = name.split("/")
+            if "fonts" not in parts:
+                continue
+            root = parts[parts.index("fonts") - 1] if parts.index("fonts") > 0 else ""
+            if root != repoName and not root.startswith(repoName + "-"):
+                continue
+            found = True
+            if "/".join(parts[parts.index("fonts"):-1]) == fontsPath:
+                sha, size, glyphs = members[name]
+                files.append((parts[-1], sha, size, name))
+        if found is False:
+            return None
+        return {"sha": self.treeSha(files), "files": files}
+
+    def repositories(self):
+        names = set()
+        for name in self.indexMembers():
+            parts = name.split("/")
+            if "fonts" in parts and parts.index("fonts") > 0:
+                root = parts[parts.index("fonts") - 1].split("-")[0]
+                if root.startswith("Noto"):
+                    names.add(root)
+        return sorted(names)
+
+    def glyphCount(self, name, sha, size):
+        glyphs = self.indexMembers()[name][2]
+        if glyphs is None:
+            raise ValueError(name + " is not an sfnt font")
+        return glyphs
+
+    def fetch(self, name, sha, size, blobs):
+        return self.fetchAll(blobs, None, [(name, sha, size)])[sha].result()
+
+    def fetchAll(self, blobs, pool, items):
+        """ Open the archive once and extract the members in their
+            order in the archive: a compressed tar is read in a single
+            pass instead of once per member.
+        """
+        name2item = {name: (name, sha, size) for name, sha, size in items}
+        futures = {sha: Future() for name, sha, size in items}
+
+        def extract(name, member):
+            name, sha, size = name2item.pop(name)
+            try:
+                with member:
+                    path = blobs.write(sha, size, iter(lambda: member.read(1 << 16), b""))
+                self.count(files=1, size=size)
+                futures[sha].set_result(path)
+            except (OSError, ValueError) as e:
+                futures[sha].set_exception(e)
+
+        if zipfile.is_zipfile(self.archivePath):
+            with zipfile.ZipFile(self.archivePath) as archive:
+                for info in archive.infolist():
+                    if info.filename in name2item:
+                        extract(info.filename, archive.open(info))
+        else:
+            with tarfile.open(self.archivePath, "r|*") as archive:
+                for info in archive:
+                    if info.name in name2item:
+                        extract(info.name, archive.extractfile(info))
+                    if len(name2item) == 0:
+                        break
+        for name, sha, size in name2item.values():
+            futures[sha].set_exception(KeyError(name + " is not in " + self.archivePath))
+        return futures
+
+
+class MirrorServer:
+    """ Serve a LocalMirrorSource folder over HTTP with the git trees and
+        raw files endpoints of GitHub, with ETag and Range support.
+        A stand-in for GitHub to benchmark the download path offline:
+        use it with --source http://<host>:<port>.
+    """
+
+    def __init__(self, folder, notoFontsFolder, port=8000, host="127.0.0.1"):
+        self.source = LocalMirrorSource(folder, notoFontsFolder)
+        source = self.source
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                tree = re.match(r"/repos/notofonts/([^/]+)/git/trees/[^/?]+", self.path)
+                raw = re.match(r"/notofonts/([^/]+)/[^/]+/(fonts/.+)$", self.path)
+                repos = re.match(r"/orgs/notofonts/repos\?.*page=(\d+)", self.path)
+                if repos:
+                    self.sendRepos(int(repos.group(1)))
+                elif tree:
+                    self.sendTree(tree.group(1))
+                elif raw:
+                    self.sendFile(raw.group(1), urllib.parse.unquote(raw.group(2)))
+                else:
+                    self.send_error(404)
+
+            def sendRepos(self, page):
+                repos = []
+                if page == 1:
+                    repos = [{"name": r} for r in source.repositories()]
+                body = json.dumps(repos).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def sendTree(self, repoName):
+                entries = []
+                for fontsPath in ["fonts/ttf/unhinted/instance_ttf",
+                                "fonts/ttf/hinted/instance_ttf"]:
+                    listing = source.listing(repoName, fontsPath)
+                    if listing is None:
+                        self.send_error(404)
+                        return
+                    entries.append({"path": fontsPath, "type": "tree", "sha": listing["sha"]})
+                    for name, sha, size, path in listing["files"]:
+                        entries.append({"path": fontsPath + "/" + name,
+                            "type": "blob", "sha": sha, "size": size})
+                body = json.dumps({"tree": entries, "truncated": False}).encode("utf-8")
+                etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def sendFile(self, repoName, path):
+                ftpath = os.path.join(source.folder, repoName, *path.split("/"))
+                if not os.path.isfile(ftpath):
+                    self.send_error(404)
+                    return
+                size = os.path.getsize(ftpath)
+                start = 0
+                end = size
+                rangeHeader = re.match(r"bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+                if rangeHeader and int(rangeHeader.group(1)) < size:
+                    start = int(rangeHeader.group(1))
+                    if rangeHeader.group(2) != "":
+                        end = min(size, int(rangeHeader.group(2)) + 1)
+                    self.send_response(206)
+                    self.send_header("Content-Range",
+                        "bytes " + str(start) + "-" + str(end - 1) + "/" + str(size))
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Length", str(end - start))
+                self.end_headers()
+                with open(ftpath, "rb") as f:
+                    f.seek(start)
+                    if end == size:
+                        shutil.copyfileobj(f, self.wfile)
+                    else:
+                        self.wfile.write(f.read(end - start))
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return "http://" + host + ":" + str(port)
+
+    def serve(self):
+        print("INFO: serving", self.source.folder, "on", self.url)
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class Manifest:
+    """ Hashes, sizes and mtimes of the fonts of NotoFonts, written by
+        --prefetch and checked by --verify. The check trusts the files
+        whose size and mtime did not change, and only hashes the others.
+    """
+
+    def __init__(self, notoFontsFolder):
+        self.notoFontsFolder = notoFontsFolder
+        self.path = os.path.join(notoFontsFolder, "manifest.json")
+        self.files = dict()
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.files = json.load(f)["files"]
+
+    def update(self, entries):
+        """ entries: {path relative to NotoFonts: (blob sha, size)}
+        """
+        for relpath, (sha, size) in entries.items():
+            st = os.stat(os.path.join(self.notoFontsFolder, *relpath.split("/")))
+            self.files[relpath] = {"sha": sha, "size": size, "mtime": st.st_mtime_ns}
+
+    def save(self):
+        with open(self.path + ".tmp", "w") as f:
+            json.dump({"files": self.files}, f, indent=1, sort_keys=True)
+        os.replace(self.path + ".tmp", self.path)
+
+    def checkFile(self, relpath):
+        """ Returns (relpath, status), status being ok, missing,
+            size (wrong size) or sha (wrong content).
+        """
+        entry = self.files[relpath]
+        path = os.path.join(self.notoFontsFolder, *relpath.split("/"))
+        if not os.path.exists(path):
+            return relpath, "missing"
+        st = os.stat(path)
+        if st.st_size != entry["size"]:
+            return relpath, "size"
+        if st.st_mtime_ns == entry["mtime"]:
+            return relpath, "ok"
+        if BlobStore.hashFile(path) != entry["sha"]:
+            return relpath, "sha"
+        return relpath, "hashed"
+
+    def verify(self, jobs=8):
+        """ Returns the list of the (relpath, status) that are not ok.
+        """
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(self.checkFile, sorted(self.files)))
+        hashed = [r for r, status in results if status == "hashed"]
+        for relpath in hashed:
+            # same content, only touched: trust it next time
+            path = os.path.join(self.notoFontsFolder, *relpath.split("/"))
+            self.files[relpath]["mtime"] = os.stat(path).st_mtime_ns
+        if len(hashed) > 0:
+            self.save()
+        print("INFO:", len(results), "files checked,", len(hashed), "hashed")
+        return [(r, status) for r, status in results if status not in ["ok", "hashed"]]
+
+
+class Download:
+    def __init__(self, repo_names, scriptsFolder, hinted=False, jobs=8, source=None, fontIndex=None):
+        self.repoNames = repo_names
+        self.notoFontsFolder = os.path.join(scriptsFolder, "NotoFonts")
+        if not os.path.exists(self.notoFontsFolder):
+                os.makedirs(self.notoFontsFolder)
+        self.hinted = hinted
+        self.jobs = max(1, int(jobs))
+        if source is None or isinstance(source, str):
+            source = FontSource.fromSpec(source, self.notoFontsFolder, self.jobs)
+        self.source = source
+        self.blobs = BlobStore(os.path.join(self.notoFontsFolder, "blobs"))
+        if fontIndex is None:
+            fontIndex = FontIndex(self.notoFontsFolder)
+        self.fontIndex = fontIndex
+        self.editedRepoNames = copy.deepcopy(repo_names)
+        self.resolvedNames = dict()
+        self.repo2files = None
+
+    @property
+    def fontsPath(self):
+        if self.hinted is False:
+            return "fonts/ttf/unhinted/instance_ttf"
+        return "fonts/ttf/hinted/instance_ttf"
+
+    def resolveRepo(self, i):
+        """ Find the repository (falling back from Serif to Sans) and
+            list its instances.
+            Returns (askedByUser, repoName, files), repoName being None
+            if nothing has been found.
+        """
+        askedByUser = i
+        listing = self.source.listing(i, self.fontsPath)
+        if listing is None:
+            i = i.replace("Serif", "Sans")
+            listing = self.source.listing(i, self.fontsPath)
+            if listing is None:
+                return askedByUser, None, None
+        return askedByUser, i, self.listFiles(i, listing)
+
+    def resolveRepos(self):
+        """ List all the asked repositories, without downloading them.
+        """
+        if self.repo2files is not None:
+            return
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            resolved = list(pool.map(self.resolveRepo, self.repoNames))
+        self.repo2files = dict()
+        for askedByUser, repoName, files in resolved:
+            if repoName is None:
+                print(askedByUser, "does not exist." +
+                        "Removed from writing system list"
+                        )
+                self.editedRepoNames.remove(askedByUser)
+                continue
+            for z in range(len(self.editedRepoNames)):
+                if self.editedRepoNames[z] == askedByUser:
+                    self.editedRepoNames[z] = repoName
+            self.resolvedNames[askedByUser] = repoName
+            self.repo2files[repoName] = files
+
+    def availableFonts(self, repoName):
+        """ Names of the instances of a repository (downloaded or not).
+        """
+        self.resolveRepos()
+        return [os.path.basename(f[1]) for f in self.repo2files.get(repoName, [])]
+
+    def listFiles(self, repoName, listing):
+        """ List the (locator, destination path, blob sha, size) of the
+            files of a repository.
+        """
+        dest = os.path.join(self.notoFontsFolder, repoName, "instance_ttf")
+        if not os.path.exists(dest):
+            os.makedirs(dest, exist_ok=True)
+        files = []
+        for name, sha, size, locator in listing["files"]:
+            files.append((locator, os.path.join(dest, name), sha, size))
+        return files
+
+    def isCurrent(self, file):
+        """ Is the local font the one listed in the repository?
+        """
+        locator, path, blobSha, size = file
+        if not os.path.exists(path) or not self.blobs.has(blobSha):
+            return False
+        if os.path.samefile(path, self.blobs.path(blobSha)):
+            return True
+        # no hardlinks on this filesystem
+        return os.path.getsize(path) == size and BlobStore.hashFile(path) == blobSha
+
+    def pruneFolder(self, files):
+        """ Remove the fonts that are no longer in the repository.
+        """
+        for folder in set(os.path.dirname(f[1]) for f in files):
+            listed = set(f[1] for f in files if os.path.dirname(f[1]) == folder)
+            for ft in os.listdir(folder):
+                if ft.endswith(".ttf") and os.path.join(folder, ft) not in listed:
+                    os.remove(os.path.join(folder, ft))
+
+    def glyphCounts(self, wanted):
+        """ For each repository of wanted (see dwnldFonts), the glyph
+            count of its biggest font among the ones dwnldFonts would
+            fetch, read from the blob store or, before downloading, from
+            the source. The counts are cached by blob sha.
+        """
+        self.resolveRepos()
+        cachePath = os.path.join(self.notoFontsFolder, "metadata", "glyphcounts.json")
+        cached = dict()
+        if os.path.exists(cachePath):
+            with open(cachePath, "r") as f:
+                cached = json.load(f)
+        repo2files = dict()
+        for repoName in wanted:
+            if repoName not in self.repo2files:
+                continue
+            name2file = {os.path.basename(f[1]): f for f in self.repo2files[repoName]}
+            repo2files[repoName] = [
+                name2file[[c for c in candidates if c in name2file][0]]
+                for candidates in wanted[repoName]
+                if any(c in name2file for c in candidates)
+                ]
+
+        def count(file):
+            locator, path, sha, size = file
+            if sha in cached:
+                return sha, cached[sha]
+            try:
+                if self.blobs.has(sha):
+                    return sha, FontSource.fileGlyphCount(self.blobs.path(sha))
+                return sha, self.source.glyphCount(locator, sha, size)
+            except (OSError, ValueError, requests.RequestException) as e:
+                print("WARN: glyphs of", os.path.basename(path), "not counted:", e)
+                return sha, None
+
+        files = set(f for files in repo2files.values() for f in files)
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            counts = dict(pool.map(count, files))
+        cached.update({sha: glyphs for sha, glyphs in counts.items() if glyphs is not None})
+        os.makedirs(os.path.dirname(cachePath), exist_ok=True)
+        with open(cachePath + ".tmp", "w") as f:
+            json.dump(cached, f)
+        os.replace(cachePath + ".tmp", cachePath)
+        return {
+            repoName: max([0] + [counts[f[2]] or 0 for f in files])
+            for repoName, files in repo2files.items()
+            }
+
+    def dwnldFonts(self, wanted=None):
+        """ Fetch the fonts through a pool of at most self.jobs threads.
+            wanted gives, for each repository, lists of font names by
+            order of preference: only the first available one of each
+            list is fetched, the next one being tried if it fails.
+            Everything is fetched if wanted is None.
+        """
+        self.resolveRepos()
+        repo2name2file = dict()
+        for repoName in self.repo2files:
+            repo2name2file[repoName] = {
+                os.path.basename(f[1]): f for f in self.repo2files[repoName]
+                }
+        pending = []
+        if wanted is None:
+            for repoName in self.repo2files:
+                for name in repo2name2file[repoName]:
+                    pending.append((repoName, [name]))
+        else:
+            for repoName in wanted:
+                if repoName not in repo2name2file:
+                    continue
+                for candidates in wanted[repoName]:
+                    candidates = [c for c in candidates if c in repo2name2file[repoName]]
+                    if len(candidates) > 0 and (repoName, candidates) not in pending:
+                        pending.append((repoName, candidates))
+
+        failedBlobs = set()
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            while len(pending) > 0:
+                # each blob is fetched once, even if several files share it
+                blob2item = dict()
+                attempts = []
+                for repoName, candidates in pending:
+                    candidates = [
+                        c for c in candidates
+                        if repo2name2file[repoName][c][2] not in failedBlobs
+                        ]
+                    if len(candidates) == 0:
+                        continue
+                    file = repo2name2file[repoName][candidates[0]]
+                    current = self.isCurrent(file)
+                    if current is False and not self.blobs.has(file[2]):
+                        blob2item[file[2]] = (file[0], file[2], file[3])
+                    attempts.append((repoName, candidates, file, current))
+                if len(blob2item) > 0:
+                    print("INFO:", len(blob2item), "fonts to download")
+                blob2future = self.source.fetchAll(self.blobs, pool, list(blob2item.values()))
+
+                pending = []
+                for repoName, candidates, file, current in attempts:
+                    future = blob2future.get(file[2])
+                    if future is not None and future.exception() is not None:
+                        print("WARN:", candidates[0], "download failed:", future.exception())
+                        failedBlobs.add(file[2])
+                        pending.append((repoName, candidates[1:]))
+                        continue
+                    if current is False:
+                        self.blobs.link(file[2], file[1])
+                    self.fontIndex.add(file[1], file[2])
+
+        for repoName in self.repo2files:
+            self.pruneFolder(self.repo2files[repoName])
+        self.fontIndex.prune()
+        stats = self.source.stats()
+        print("INFO:", stats["files"], "files fetched,", stats["requests"],
+            "requests,", stats["retries"], "retries,", stats["bytes"], "bytes received"
+            )
+
+    def manifestEntries(self):
+        """ {path relative to NotoFonts: (blob sha, size)} of the local
+            fonts that are up to date.
+        """
+        entries = dict()
+        for repoName in self.repo2files:
+            for file in self.repo2files[repoName]:
+                if self.isCurrent(file):
+                    relpath = os.path.relpath(file[1], self.notoFontsFolder)
+                    entries[relpath.replace(os.sep, "/")] = (file[2], file[3])
+        return entries
 
     def getEditedRepoNames(self):
         return self.editedRepoNames
 
+    def close(self):
+        self.source.close()
+
+    def getStats(self):
+        return self.source.stats()
+
+
+class CmapReader:
+    """ Reads the Windows platform cmap of a font straight from the
+        binary: the file is memory-mapped, the cmap table found through
+        the table directory and its format 4 and 12 subtables decoded into
+        codepoint / glyph ID arrays, without building a TTFont nor naming
+        the glyphs. Other formats raise ValueError, the caller falls back
+        to fontTools.
+    """
+
+    def __init__(self, ftpath, data=None):
+        self.path = ftpath
+        self.data = data
+        self.uni2gid = None
+
+    def tableDirectory(self, data):
+        offset = 0
+        if data[:4] == b"ttcf":
+            offset = struct.unpack_from(">L", data, 12)[0]
+        if data[offset:offset + 4] not in (b"\x00\x01\x00\x00", b"OTTO", b"true"):
+            raise ValueError(self.path + " is not an sfnt font")
+        numTables = struct.unpack_from(">H", data, offset + 4)[0]
+        tables = dict()
+        for i in range(numTables):
+            tag, _, tableOffset, length = struct.unpack_from(
+                ">4sLLL", data, offset + 12 + 16 * i
+                )
+            tables[tag] = (tableOffset, length)
+        return tables
+
+    @staticmethod
+    def format4(data, offset):
+        segCount = struct.unpack_from(">H", data, offset + 6)[0] // 2
+        length = struct.unpack_from(">H", data, offset + 2)[0]
+        values = array("H", data[offset + 14:offset + max(length, 16 + 8 * segCount)])
+        if sys.byteorder != "big":
+            values.byteswap()
+        endCode = values[:segCount]
+        startCode = values[segCount + 1:2 * segCount + 1]
+        idDelta = values[2 * segCount + 1:3 * segCount + 1]
+        idRangeOffset = values[3 * segCount + 1:4 * segCount + 1]
+        glyphIndexArray = values[4 * segCount + 1:]
+        uni2gid = dict()
+        for i in range(segCount - 1):
+            start, end, delta = startCode[i], endCode[i], idDelta[i]
+            first = (start + delta) & 0xFFFF
+            if idRangeOffset[i] == 0 and first and first + end - start <= 0xFFFF:
+                uni2gid.update(zip(range(start, end + 1), range(first, first + end - start + 1)))
+            elif idRangeOffset[i] == 0:
+                for code in range(start, end + 1):
+                    gid = (code + delta) & 0xFFFF
+                    if gid:
+                        uni2gid[code] = gid
+            else:
+                partial = idRangeOffset[i] // 2 - start + i - segCount
+                if start <= end and not (
+                    0 <= start + partial and end + partial < len(glyphIndexArray)
+                    ):
+                    raise ValueError("cmap format 4 glyph index out of range")
+                gids = glyphIndexArray[start + partial:end + partial + 1]
+                if delta:
+                    gids = [(g + delta) & 0xFFFF if g else 0 for g in gids]
+                # 0 is the missing glyph, it does not map anything
+                uni2gid.update(itertools.compress(zip(range(start, end + 1), gids), gids))
+        return uni2gid
+
+    @staticmethod
+    def format12(data, offset):
+        nGroups = struct.unpack_from(">L", data, offset + 12)[0]
+        groups = array("I", data[offset + 16:offset + 16 + 12 * nGroups])
+        if sys.byteorder != "big":
+            groups.byteswap()
+        starts, ends, gids = groups[0::3], groups[1::3], groups[2::3]
+        if (
+            max(ends, default=0) <= 0x10FFFF
+            and 0 not in gids
+            and all(map(operator.le, starts, ends))
+            and all(map(operator.ge, starts[1:], ends))
+            ):
+            # well-formed subtable: expand all the groups at C speed, a
+            # group starting on the previous group's end overrides it
+            return dict(zip(
+                itertools.chain.from_iterable(map(range, starts, [e + 1 for e in ends])),
+                itertools.chain.from_iterable(
+                    map(range, gids, [g + e - s + 1 for s, e, g in zip(starts, ends, gids)])
+                    ),
+                ))
+        uni2gid = dict()
+        lastEnd = 0
+        for start, end, gid in zip(starts, ends, gids):
+            end = min(end, 0x10FFFF)
+            # same rules as fontTools (and HarfBuzz) for broken groups
+            if start > end or start < lastEnd:
+                continue
+            lastEnd = end
+            if gid == 0:
+                start, gid = start + 1, 1
+            uni2gid.update(zip(range(start, end + 1), range(gid, gid + end - start + 1)))
+        return uni2gid
+
+    def read(self):
+        """ {codepoint: glyph ID}, the first Windows subtable wins.
+        """
+        if self.uni2gid is None:
+            if self.data is not None:
+                self.uni2gid = self.decode(self.data)
+            else:
+                with open(self.path, "rb") as f:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        self.uni2gid = self.decode(data)
+        return self.uni2gid
+
+    def decode(self, data):
+        tables = self.tableDirectory(data)
+        if b"cmap" not in tables:
+            raise ValueError(self.path + " has no cmap table")
+        cmapOffset = tables[b"cmap"][0]
+        numTables = struct.unpack_from(">H", data, cmapOffset + 2)[0]
+        uni2gid = dict()
+        for i in range(numTables):
+            platformID, _, offset = struct.unpack_from(
+                ">HHL", data, cmapOffset + 4 + 8 * i
+                )
+            if platformID != 3:
+                continue
+            offset += cmapOffset
+            format = struct.unpack_from(">H", data, offset)[0]
+            if format == 4:
+                subtable = self.format4(data, offset)
+            elif format == 12:
+                subtable = self.format12(data, offset)
+            else:
+                raise ValueError("cmap format " + str(format) + " is not supported")
+            # earlier subtables take precedence
+            subtable.update(uni2gid)
+            uni2gid = subtable
+        return uni2gid
+
+    def mapping(self):
+        """ Sorted codepoints and their glyph IDs, as two arrays.
+        """
+        uni2gid = self.read()
+        codepoints = array("I", sorted(uni2gid))
+        return codepoints, array("I", [uni2gid[u] for u in codepoints])
+
+    def codepoints(self):
+        return array("I", sorted(self.read()))
+
+    @staticmethod
+    def toRanges(codepoints):
+        """ [(first, last), …] runs of consecutive sorted codepoints.
+        """
+        ranges = []
+        for uni in codepoints:
+            if ranges and ranges[-1][1] + 1 == uni:
+                ranges[-1][1] = uni
+            else:
+                ranges.append([uni, uni])
+        return [tuple(r) for r in ranges]
+
+    def ranges(self):
+        return self.toRanges(self.codepoints())
+
+
+class FontIndex:
+    """ Sidecar SQLite index of the fonts, stored next to the font cache
+        and keyed by the git blob SHA of the file: cmap (Windows platform),
+        glyph order, UPM, glyph count and naming. Download indexes each
+        font as soon as it is fetched; the next lookups, in this run or
+        the next ones, do not open it again.
+        Only the fonts of the blob store are written to the database.
+        It holds the downloaded fonts of every source: GitHub, and the
+        local mirrors and archives whose fonts are copied into the blob
+        store. The other ones (outputs, scaled or subset fonts) are
+        indexed for the current run only.
+    """
+
+    schema = 1
+
+    def __init__(self, notoFontsFolder, fontCache=None):
+        if not os.path.exists(notoFontsFolder):
+            os.makedirs(notoFontsFolder, exist_ok=True)
+        self.fontCache = fontCache
+        self.path = os.path.join(notoFontsFolder, "fontindex.sqlite")
+        self.lock = threading.RLock()
+        self.records = dict()
+        self.shas = dict()
+        self.blobs = BlobStore(os.path.join(notoFontsFolder, "blobs"))
+        self.connect()
+
+    def connect(self):
+        """ Open the database. A connection can't be used across a fork:
+            it is closed before forking and opened again on both sides.
+        """
+        # the style workers write to the same database: wait for their
+        # locks instead of failing with "database is locked"
+        self.db = sqlite3.connect(self.path, timeout=60, check_same_thread=False)
+        version = self.db.execute("PRAGMA user_version").fetchone()[0]
+        if version != self.schema:
+            self.db.executescript("""
+                DROP TABLE IF EXISTS fonts;
+                DROP TABLE IF EXISTS paths;
+                """)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS fonts (
+                sha TEXT PRIMARY KEY,
+                upm INTEGER,
+                glyphCount INTEGER,
+                glyphOrder TEXT,
+                codepoints BLOB,
+                glyphIDs BLOB,
+                family TEXT,
+                subfamily TEXT,
+                typoFamily TEXT,
+                typoSubfamily TEXT,
+                weightClass INTEGER,
+                widthClass INTEGER,
+                italic INTEGER
+            );
+            CREATE TABLE IF NOT EXISTS paths (
+                path TEXT PRIMARY KEY,
+                size INTEGER,
+                mtime INTEGER,
+                sha TEXT
+            );
+            PRAGMA user_version = """ + str(self.schema) + """;
+            """)
+        self.db.commit()
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+    def sha(self, ftpath):
+        """ Git blob SHA of a file, only rehashed when its size or mtime
+            changed.
+        """
+        if self.fontCache is not None and self.fontCache.sha(ftpath) is not None:
+            return self.fontCache.sha(ftpath)
+        ftpath = os.path.abspath(ftpath)
+        st = os.stat(ftpath)
+        key = (ftpath, st.st_size, st.st_mtime_ns)
+        with self.lock:
+            if key in self.shas:
+                return self.shas[key]
+            row = self.db.execute(
+                "SELECT size, mtime, sha FROM paths WHERE path = ?", (ftpath,)
+                ).fetchone()
+        if row is not None and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        sha = BlobStore.hashFile(ftpath)
+        self.addPath(ftpath, sha, st)
+        return sha
+
+    def addPath(self, ftpath, sha, st):
+        with self.lock:
+            self.shas[(ftpath, st.st_size, st.st_mtime_ns)] = sha
+            if not self.blobs.has(sha):
+                return
+            self.db.execute(
+                "INSERT OR REPLACE INTO paths VALUES (?, ?, ?, ?)",
+                (ftpath, st.st_size, st.st_mtime_ns, sha)
+                )
+            self.db.commit()
+
+    def add(self, ftpath, sha):
+        """ Index a font of the blob store, known to have this SHA.
+        """
+        ftpath = os.path.abspath(ftpath)
+        st = os.stat(ftpath)
+        with self.lock:
+            path = self.db.execute(
+                "SELECT size, mtime, sha FROM paths WHERE path = ?", (ftpath,)
+                ).fetchone()
+            row = self.db.execute(
+                "SELECT sha FROM fonts WHERE sha = ?", (sha,)
+                ).fetchone()
+        if path != (st.st_size, st.st_mtime_ns, sha):
+            self.addPath(ftpath, sha, st)
+        if row is None:
+            self.build(sha, ftpath)
+
+    def prune(self):
+        """ Forget the paths that no longer exist and the fonts that
+            are no longer in the blob store.
+        """
+        with self.lock:
+            paths = self.db.execute("SELECT path FROM paths").fetchall()
+            self.db.executemany(
+                "DELETE FROM paths WHERE path = ?",
+                [row for row in paths if not os.path.exists(row[0])]
+                )
+            shas = self.db.execute("SELECT sha FROM fonts").fetchall()
+            self.db.executemany(
+                "DELETE FROM fonts WHERE sha = ?",
+                [row for row in shas if not self.blobs.has(row[0])]
+                )
+            self.db.commit()
+
+    @staticmethod
+    def packArray(values):
+        packed = array("I", values)
+        if sys.byteorder == "big":
+            packed.byteswap()
+        return packed.tobytes()
+
+    @staticmethod
+    def unpackArray(data):
+        unpacked = array("I")
+        unpacked.frombytes(data)
+        if sys.byteorder == "big":
+            unpacked.byteswap()
+        return unpacked
+
+    def build(self, sha, ftpath):
+        data = None
+        if self.fontCache is not None:
+            font = self.fontCache.get(ftpath)
+            data = self.fontCache.memoryData(ftpath)
+        else:
+            font = ttLib.TTFont(ftpath, lazy=True)
+        glyphOrder = font.getGlyphOrder()
+        try:
+            uni2gid = {
+                u: g for u, g in CmapReader(ftpath, data).read().items()
+                if g < len(glyphOrder)
+                }
+        except ValueError:
+            glyphIDs = {g: i for i, g in enumerate(glyphOrder)}
+            uni2gid = dict()
+            for table in font["cmap"].tables:
+                if table.platformID == 3:
+                    for uni, name in table.cmap.items():
+                        if uni not in uni2gid:
+                            uni2gid[uni] = glyphIDs[name]
+        codepoints = sorted(uni2gid)
+        name = font["name"]
+        os2 = font.get("OS/2")
+        row = (
+            sha,
+            font["head"].unitsPerEm,
+            len(glyphOrder),
+            "\n".join(glyphOrder),
+            self.packArray(codepoints),
+            self.packArray([uni2gid[u] for u in codepoints]),
+            name.getDebugName(1),
+            name.getDebugName(2),
+            name.getDebugName(16),
+            name.getDebugName(17),
+            os2.usWeightClass if os2 is not None else None,
+            os2.usWidthClass if os2 is not None else None,
+            int(font["head"].macStyle & 2 != 0),
+        )
+        if self.fontCache is None:
+            font.close()
+        if data is not None or not self.blobs.has(sha):
+            # the other fonts only live for one build
+            return row
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO fonts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+                )
+            self.db.commit()
+        return row
+
+    def record(self, ftpath):
+        sha = self.sha(ftpath)
+        if sha in self.records:
+            return self.records[sha]
+        with self.lock:
+            row = self.db.execute(
+                "SELECT * FROM fonts WHERE sha = ?", (sha,)
+                ).fetchone()
+        if row is None:
+            row = self.build(sha, ftpath)
+        keys = ["sha", "upm", "glyphCount", "glyphOrder", "codepoints", "glyphIDs",
+            "family", "subfamily", "typoFamily", "typoSubfamily",
+            "weightClass", "widthClass", "italic"]
+        record = dict(zip(keys, row))
+        record["glyphOrder"] = record["glyphOrder"].split("\n")
+        record["codepoints"] = self.unpackArray(record["codepoints"])
+        record["glyphIDs"] = self.unpackArray(record["glyphIDs"])
+        self.records[sha] = record
+        return record
+
+    def codepoints(self, ftpath):
+        return self.record(ftpath)["codepoints"]
+
+    def ranges(self, ftpath):
+        return CmapReader.toRanges(self.codepoints(ftpath))
+
+    def cmap(self, ftpath):
+        """ {codepoint: glyph name} of the Windows platform cmaps.
+        """
+        record = self.record(ftpath)
+        glyphOrder = record["glyphOrder"]
+        return {
+            u: glyphOrder[g] for u, g in zip(record["codepoints"], record["glyphIDs"])
+            }
+
+    def glyphOrder(self, ftpath):
+        return list(self.record(ftpath)["glyphOrder"])
+
+    def upm(self, ftpath):
+        return self.record(ftpath)["upm"]
+
+    def glyphCount(self, ftpath):
+        return self.record(ftpath)["glyphCount"]
+
+    def styleInfo(self, ftpath):
+        record = self.record(ftpath)
+        return {k: record[k] for k in ["family", "subfamily", "typoFamily",
+            "typoSubfamily", "weightClass", "widthClass", "italic"]}
+
+
+class FontCache:
+    """ Process-wide LRU cache of the fonts used during a build, bounded
+        in number of fonts and in compiled bytes. Fonts are opened with lazy=True,
+        so a stage only decompiles the tables it touches.
+        get() returns a shared font that must not be modified; stages
+        that modify a font take their own copy() (parsed from the cached
+        bytes, without reading the disk again).
+        The fonts made during a build are kept in memory under a name,
+        used in place of a path by the next stages, and are not evicted
+        until they are released.
+    """
+
+    def __init__(self, maxFonts=64, maxBytes=1 << 30):
+        self.maxFonts = maxFonts
+        self.maxBytes = maxBytes
+        self.lock = threading.RLock()
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.compiledBytes = 0
+        self.memory = dict()
+
+    def key(self, ftpath):
+        st = os.stat(ftpath)
+        return (os.path.abspath(ftpath), st.st_size, st.st_mtime_ns)
+
+    def entry(self, ftpath):
+        with self.lock:
+            if ftpath in self.memory:
+                self.hits += 1
+                return self.memory[ftpath]
+        key = self.key(ftpath)
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return self.entries[key]
+            self.misses += 1
+        with open(ftpath, "rb") as f:
+            data = f.read()
+        entry = {"data": data, "font": None}
+        with self.lock:
+            self.entries[key] = entry
+            self.compiledBytes += len(data)
+            self.evict()
+        return entry
+
+    def evict(self):
+        while len(self.entries) > 1 and (
+            len(self.entries) > self.maxFonts or self.compiledBytes > self.maxBytes
+            ):
+            key, entry = self.entries.popitem(last=False)
+            self.compiledBytes -= len(entry["data"])
+            self.evictions += 1
+
+    def get(self, ftpath):
+        """ Shared, read-only font.
+        """
+        entry = self.entry(ftpath)
+        with self.lock:
+            if entry["font"] is None:
+                entry["font"] = self.font(entry["data"], True)
+            return entry["font"]
+
+    def copy(self, ftpath, lazy=True):
+        """ Font that the caller can modify.
+        """
+        return self.font(self.entry(ftpath)["data"], lazy)
+
+    @staticmethod
+    def font(data, lazy):
+        buffer = io.BytesIO(data)
+        # TTFont.save() compares the reader's file name with the target
+        # path before writing a lazy font, a bare BytesIO has no name.
+        buffer.name = None
+        return ttLib.TTFont(buffer, lazy=lazy)
+
+    def data(self, ftpath):
+        return self.entry(ftpath)["data"]
+
+    @staticmethod
+    def compile(font):
+        buffer = io.BytesIO()
+        # keep head.modified: the same input gives the same bytes (and
+        # blob SHA) from one run to the next
+        font.recalcTimestamp = False
+        font.save(buffer)
+        font.close()
+        return buffer.getvalue()
+
+    def keep(self, name, font):
+        """ Compile the font and keep it in memory under name.
+        """
+        return self.keepData(name, self.compile(font))
+
+    def keepData(self, name, data):
+        with self.lock:
+            self.memory[name] = {"data": data, "font": None, "sha": BlobStore.hashBytes(data)}
+        return name
+
+    def memoryData(self, name):
+        with self.lock:
+            if name in self.memory:
+                return self.memory[name]["data"]
+        return None
+
+    def sha(self, name):
+        with self.lock:
+            if name in self.memory:
+                return self.memory[name]["sha"]
+        return None
+
+    def release(self, names=None):
+        """ Forget the fonts kept in memory under these names, or all
+            of them.
+        """
+        with self.lock:
+            if names is None:
+                self.memory = dict()
+            for name in names or []:
+                self.memory.pop(name, None)
+
+    def stats(self):
+        with self.lock:
+            tables = 0
+            for entry in list(self.entries.values()) + list(self.memory.values()):
+                if entry["font"] is not None:
+                    tables += len(entry["font"].tables)
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "fonts": len(self.entries),
+                "compiledBytes": self.compiledBytes,
+                "decompiledTables": tables,
+            }
+
+
+class SubsetCache:
+    """ Subset fonts of the previous builds, in NotoFonts/subsets, keyed
+        by the blob SHA of the input font, the glyphs kept and the
+        subsetter options. The least recently used ones are removed when
+        the folder grows over maxBytes.
+    """
+
+    def __init__(self, notoFontsFolder, maxBytes=1 << 30):
+        self.folder = os.path.join(notoFontsFolder, "subsets")
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(sha, glyphs, options, unicodes=()):
+        # the fontTools version is part of the key: a new subsetter can
+        # give a different font
+        keyData = [sha, sorted(set(glyphs)), vars(options), fontToolsVersion]
+        if len(unicodes) > 0:
+            keyData.append(Ownership.toRanges(Ownership.fromRanges(
+                [(u, u) for u in unicodes]
+                )))
+        return hashlib.sha1(
+            json.dumps(keyData, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.folder, key + ".ttf")
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        os.utime(self.path(key))
+        self.hits += 1
+        return data
+
+    def put(self, key, data):
+        # the styles built in parallel can write the same key
+        tmp = self.path(key) + "." + str(os.getpid()) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self.path(key))
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".ttf"):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(e[1] for e in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class ScaledCache:
+    """ Copies of the downloaded fonts scaled at 1000 UPM, in
+        NotoFonts/scaled/<blob SHA of the source>-<UPM>/, next to a
+        provenance.json recording the source SHA and UPM, the fontTools
+        version, and the blob SHA, size and mtime of the copy. A blob is
+        scaled once, whatever repository it comes from; the downloaded
+        font is never modified.
+    """
+
+    upm = 1000
+
+    def __init__(self, notoFontsFolder, fontIndex, fontCache):
+        self.folder = os.path.join(notoFontsFolder, "scaled")
+        self.fontIndex = fontIndex
+        self.fontCache = fontCache
+
+    def get(self, ftpath):
+        """ The scaled copy of ftpath, under the name of ftpath (the next
+            stages read the family from it). It is made if it is missing
+            or does not match its recorded SHA. A copy whose size and mtime
+            are the recorded ones is not hashed again.
+        """
+        sha = self.fontIndex.sha(ftpath)
+        folder = os.path.join(self.folder, sha + "-" + str(self.upm))
+        scaled = os.path.join(folder, "scaled.ttf")
+        path = os.path.join(folder, os.path.basename(ftpath))
+        try:
+            with open(os.path.join(folder, "provenance.json"), "r") as f:
+                recorded = json.load(f)
+            if recorded["sourceSha"] == sha and recorded["upm"] == self.upm:
+                if not os.path.exists(path):
+                    BlobStore.clone(scaled, path)
+                st = os.stat(path)
+                if [st.st_size, st.st_mtime_ns] == recorded.get("stat"):
+                    self.fontIndex.addPath(os.path.abspath(path), recorded["sha"], st)
+                    return path
+                if self.fontIndex.sha(path) == recorded["sha"]:
+                    return path
+        except (OSError, KeyError, ValueError):
+            pass
+        print("    INFO: scale", os.path.basename(ftpath), "at", self.upm, "upm")
+        sourceUpm = self.fontIndex.upm(ftpath)
+        font = self.fontCache.copy(ftpath, lazy=None)
+        scale_font(font, self.upm / sourceUpm)
+        data = FontCache.compile(font)
+        provenance = {
+            "sourceSha": sha,
+            "sourceUpm": sourceUpm,
+            "upm": self.upm,
+            "fontTools": fontToolsVersion,
+            "sha": BlobStore.hashBytes(data),
+            }
+        # written in a temp folder that replaces the old one at once: the
+        # styles built in parallel can scale the same font
+        tmp = folder + "." + str(os.getpid()) + ".tmp"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        with open(os.path.join(tmp, "scaled.ttf"), "wb") as f:
+            f.write(data)
+        BlobStore.clone(os.path.join(tmp, "scaled.ttf"), os.path.join(tmp, os.path.basename(ftpath)))
+        st = os.stat(os.path.join(tmp, os.path.basename(ftpath)))
+        provenance["stat"] = [st.st_size, st.st_mtime_ns]
+        with open(os.path.join(tmp, "provenance.json"), "w") as f:
+            json.dump(provenance, f, indent=2)
+        shutil.rmtree(folder, ignore_errors=True)
+        try:
+            os.replace(tmp, folder)
+        except OSError:
+            # made by another process in the meantime
+            shutil.rmtree(tmp)
+        return path
+
+
+class MergeCache:
+    """ Custom fonts of the previous builds, in NotoFonts/merged: one
+        folder per build of a style, keyed by everything the merged fonts
+        are made from, holding the saved outputs (ttf, woff2). The least
+        recently used builds are removed when the folder grows over
+        maxBytes.
+    """
+
+    def __init__(self, notoFontsFolder, maxBytes=1 << 30):
+        self.folder = os.path.join(notoFontsFolder, "merged")
+        if not os.path.exists(self.folder):
+            os.makedirs(self.folder, exist_ok=True)
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(keyData):
+        return hashlib.sha1(
+            json.dumps(keyData, sort_keys=True, default=str).encode("utf-8")
+            ).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.folder, key)
+
+    def get(self, key, destination):
+        """ Copy the outputs of this build into destination and return
+            their names, or None if it is not cached.
+        """
+        try:
+            names = sorted(os.listdir(self.path(key)))
+            for name in names:
+                shutil.copyfile(
+                    os.path.join(self.path(key), name), os.path.join(destination, name)
+                    )
+            os.utime(self.path(key))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return names
+
+    def put(self, key, outputs):
+        # the outputs are gathered in a temp folder that replaces the
+        # entry at once: the styles built in parallel can write it too
+        tmp = self.path(key) + "." + str(os.getpid()) + ".tmp"
+        if os.path.exists(tmp):
+            shutil.rmtree(tmp)
+        os.makedirs(tmp)
+        for output in outputs:
+            shutil.copyfile(output, os.path.join(tmp, os.path.basename(output)))
+        try:
+            os.replace(tmp, self.path(key))
+        except OSError:
+            # already stored by another process
+            shutil.rmtree(tmp)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                entries.append((entry.stat().st_mtime_ns, size, entry.path))
+            except FileNotFoundError:
+                continue
+        total = sum(e[1] for e in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.maxBytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+
+class RssMonitor:
+    """ Peak resident set size of the process while a block runs, and
+        how much it grew from the start of the block. A thread samples
+        the current RSS every interval seconds from /proc/self/statm:
+        peak and growth stay None where it does not exist.
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = None
+        self.peak = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    @staticmethod
+    def current():
+        try:
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * mmap.PAGESIZE
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def sample(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.start = self.peak = self.current()
+        if self.start is not None:
+            self.thread = threading.Thread(target=self.sample, daemon=True)
+            self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        if self.thread is not None:
+            self.stopped.set()
+            self.thread.join()
+            self.peak = max(self.peak, self.current())
+
+    @property
+    def growth(self):
+        if self.start is None:
+            return None
+        return self.peak - self.start
+
+
+def subsetFont(data, options, glyphs, unicodes=()):
+    """ Subset the font in data and return the new font bytes. Runs in
+        the subsetting process pool.
+    """
+    font = FontCache.font(data, True)
+    subsetter = Subsetter(options=options)
+    subsetter.populate(glyphs=glyphs, unicodes=unicodes)
+    subsetter.subset(font)
+    return FontCache.compile(font)
+
+
+# the Notobuilder the style workers are forked from
+styleBuilder = None
+
+# the SHA-1 of this script, part of the merge keys
+scriptSha = None
+
+
+def builderSha():
+    """ The SHA-1 of this script, read once per process.
+    """
+    global scriptSha
+    if scriptSha is None:
+        with open(os.path.abspath(__file__), "rb") as f:
+            scriptSha = hashlib.sha1(f.read()).hexdigest()
+    return scriptSha
+
+
+def initStyleWorker():
+    """ Set up the copy of styleBuilder of a forked style worker.
+    """
+    # the pool already uses the --jobs processes
+    styleBuilder.jobs = 1
+    # the parent closed its connection before forking
+    styleBuilder.fontIndex.connect()
+
+
+def buildStyleInWorker(style):
+    """ Build one style with a copy of styleBuilder, in a forked process
+        of the style pool. Returns its log and the cache counters of
+        this style. If the build fails, its log is given to the parent
+        with the exception, as styleLog.
+    """
+    builder = styleBuilder
+    before = builder.cacheCounters()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            builder.buildStyle(style)
+    except Exception as e:
+        e.styleLog = log.getvalue()
+        raise
+    after = builder.cacheCounters()
+    return log.getvalue(), [b - a for a, b in zip(before, after)]
+
+
+class CachedMerger(merge.Merger):
+    """ merge.Merger reading its inputs through a FontCache. The input
+        fonts are closed once merged.
+    """
+
+    def __init__(self, fontCache, options=None):
+        super().__init__(options)
+        self.fontCache = fontCache
+        self.inputs = []
+
+    def _openFonts(self, fontfiles):
+        fonts = super()._openFonts(fontfiles)
+        self.inputs.extend(fonts)
+        return fonts
+
+    def merge(self, fontfiles):
+        # Merger opens each input twice: TTFont rewinds the buffer
+        buffers = []
+        for fontfile in fontfiles:
+            buffer = io.BytesIO(self.fontCache.data(fontfile))
+            buffer.name = fontfile
+            buffers.append(buffer)
+        try:
+            return super().merge(buffers)
+        finally:
+            for font in self.inputs:
+                font.close()
+            self.inputs = []
+
+
+class PresetIndex:
+    """ The glyph lists of subsets/*.json compiled into
+        subsets/presets.index: every glyph name is stored once and each
+        preset is an array of indices into the names. The index is
+        memory-mapped, and compiled again as soon as a JSON file is
+        added, removed or modified (size or mtime).
+    """
+
+    magic = b"NBPI"
+    schema = 1
+
+    def __init__(self, folder):
+        self.folder = folder
+        self.path = os.path.join(folder, "presets.index")
+        self.data = None
+        self.header = None
+        self.names = None
+        self.sets = dict()
+        self.shas = None
+
+    def sources(self):
+        sources = dict()
+        for name in sorted(os.listdir(self.folder)):
+            if name.endswith(".json"):
+                st = os.stat(os.path.join(self.folder, name))
+                sources[name] = [st.st_size, st.st_mtime_ns]
+        return sources
+
+    def contentShas(self):
+        """ {JSON file: SHA-1 of its content}, read once: unlike their
+            mtimes, it does not change when the files are checked out or
+            copied again.
+        """
+        if self.shas is None:
+            self.shas = dict()
+            for name in self.sources():
+                with open(os.path.join(self.folder, name), "rb") as f:
+                    self.shas[name] = hashlib.sha1(f.read()).hexdigest()
+        return self.shas
+
+    def compile(self, sources):
+        names, name2id, presets, arrays = [], dict(), dict(), []
+        offset = 0
+        for source in sources:
+            with open(os.path.join(self.folder, source), "r") as subsetDict:
+                subset = json.load(subsetDict)
+            presets[source] = dict()
+            for preset, glyphs in subset.items():
+                ids = set()
+                for g in glyphs:
+                    if g not in name2id:
+                        name2id[g] = len(names)
+                        names.append(g)
+                    ids.add(name2id[g])
+                packed = FontIndex.packArray(sorted(ids))
+                presets[source][preset] = [offset, len(ids)]
+                arrays.append(packed)
+                offset += len(packed)
+        namesData = "\0".join(names).encode("utf-8")
+        header = json.dumps({
+            "sources": sources,
+            "names": len(namesData),
+            "presets": presets,
+            }).encode("utf-8")
+        data = self.magic + struct.pack("<LL", self.schema, len(header)) + header + namesData + b"".join(arrays)
+        try:
+            with open(self.path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(self.path + ".tmp", self.path)
+        except OSError as e:
+            print("WARN: the preset index can't be written:", e)
+        return data
+
+    def read(self, data):
+        if data[:4] != self.magic:
+            return None
+        schema, headerSize = struct.unpack_from("<LL", data, 4)
+        if schema != self.schema:
+            return None
+        return json.loads(bytes(data[12:12 + headerSize]).decode("utf-8")), 12 + headerSize
+
+    def load(self):
+        if self.data is not None:
+            return
+        sources = self.sources()
+        data = None
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            header = self.read(data)
+            if header is None or header[0]["sources"] != sources:
+                data.close()
+                data = None
+        if data is None:
+            data = self.compile(sources)
+            header = self.read(data)
+        self.data = data
+        self.header, namesStart = header
+        self.arraysStart = namesStart + self.header["names"]
+        self.names = [
+            sys.intern(n) for n in bytes(data[namesStart:self.arraysStart]).decode("utf-8").split("\0")
+            ]
+
+    def presets(self, source):
+        self.load()
+        return list(self.header["presets"].get(source, {}))
+
+    def glyphs(self, source, preset):
+        """ Glyph names of a preset of subsets/<source>, as a frozenset.
+        """
+        if (source, preset) not in self.sets:
+            self.load()
+            if source not in self.header["presets"]:
+                raise FileNotFoundError(os.path.join(self.folder, source))
+            offset, count = self.header["presets"][source][preset]
+            start = self.arraysStart + offset
+            ids = FontIndex.unpackArray(bytes(self.data[start:start + 4 * count]))
+            self.sets[(source, preset)] = frozenset(self.names[i] for i in ids)
+        return self.sets[(source, preset)]
+
+
+class StyleIndex:
+    """ Fonts of each repository by (family, width, weight, italic),
+        built once from the file names. Style resolution is then a dict
+        lookup and does not touch the filesystem.
+    """
+
+    widths = ["ExtraCondensed", "SemiCondensed", "Condensed"]
+
+    def __init__(self, repo2fonts):
+        self.repo2styles = dict()
+        self.repo2names = dict()
+        self.folders = dict()
+        for repoName, fonts in repo2fonts.items():
+            self.repo2styles[repoName] = dict()
+            self.repo2names[repoName] = list()
+            for ftname in fonts:
+                key = self.parse(ftname)
+                if key is not None:
+                    self.repo2styles[repoName].setdefault(key, ftname)
+                    self.repo2names[repoName].append(ftname.split("-")[1].replace(".ttf", ""))
+
+    @classmethod
+    def fromCache(cls, notoFontsFolder, repoNames, path="instance_ttf"):
+        """ Index of the fonts present in the cache: one listing per
+            repository.
+        """
+        repo2fonts = dict()
+        for repoName in repoNames:
+            folder = os.path.join(notoFontsFolder, repoName, path)
+            if os.path.isdir(folder):
+                repo2fonts[repoName] = [f for f in os.listdir(folder) if f.endswith(".ttf")]
+            else:
+                repo2fonts[repoName] = []
+        index = cls(repo2fonts)
+        for repoName in repoNames:
+            index.folders[repoName] = os.path.join(notoFontsFolder, repoName, path)
+        return index
+
+    @classmethod
+    def parse(cls, ftname):
+        """ NotoSans-CondensedSemiBoldItalic.ttf → ("NotoSans", "Condensed",
+            "SemiBold", True).
+        """
+        if not ftname.endswith(".ttf") or "-" not in ftname:
+            return None
+        family, style = ftname[:-4].split("-", 1)
+        italic = style.endswith("Italic")
+        if italic:
+            style = style[:-len("Italic")]
+        width = "Normal"
+        for w in cls.widths:
+            if style.startswith(w):
+                width, style = w, style[len(w):]
+                break
+        return (family, width, style or "Regular", italic)
+
+    def styleNames(self, repoName):
+        """ Style part of the names of the fonts of a repository.
+        """
+        return list(self.repo2names.get(repoName, []))
+
+    def name(self, repoName, ftname):
+        """ Name of the indexed font of the same style as ftname, if any:
+            NotoSans-RegularItalic.ttf is found as NotoSans-Italic.ttf.
+        """
+        return self.repo2styles.get(repoName, {}).get(self.parse(os.path.basename(ftname)))
+
+    def find(self, repoName, candidates):
+        """ Path of the first candidate of the repository that is indexed.
+        """
+        for ftpath in candidates:
+            ftname = self.name(repoName, ftpath)
+            if ftname is not None:
+                return os.path.join(self.folders[repoName], ftname)
+        return None
+
+
+class Ownership:
+    """ Owner of every codepoint of a build: the first font, in the
+        order of the merge, that maps it. Codepoint sets are bitsets
+        (Python ints, bit n set for U+n) built from the ranges of the
+        font index, so the whole assignment is one pass of a few big
+        integer operations per font.
+        It only depends on the fonts and their order: it is saved in
+        NotoFonts/ownership under a key made of their blob SHAs. The
+        least recently used ones are removed when the folder grows over
+        maxBytes.
+    """
+
+    maxBytes = 1 << 30
+
+    def __init__(self, fonts=()):
+        """ fonts: [(name, blob sha, [(first, last), …]), …] by order of
+            priority.
+        """
+        self.names = []
+        self.shas = []
+        self.masks = []
+        self.owned = []
+        covered = 0
+        for name, sha, ranges in fonts:
+            mask = self.fromRanges(ranges)
+            self.names.append(name)
+            self.shas.append(sha)
+            self.masks.append(mask)
+            self.owned.append(mask & ~covered)
+            covered |= mask
+
+    @staticmethod
+    def key(shas):
+        return hashlib.sha1("\n".join(shas).encode("ascii")).hexdigest()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fonts = []
+        for i in range(len(self.names)):
+            fonts.append({
+                "name": self.names[i],
+                "sha": self.shas[i],
+                "codepoints": self.toRanges(self.masks[i]),
+                "owned": self.toRanges(self.owned[i]),
+                })
+        tmp = path + "." + str(os.getpid()) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"fonts": fonts}, f)
+        os.replace(tmp, path)
+        self.evict(os.path.dirname(path))
+
+    @classmethod
+    def evict(cls, folder):
+        entries = []
+        for entry in os.scandir(folder):
+            if entry.name.endswith(".json"):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(e[1] for e in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= cls.maxBytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    @classmethod
+    def load(cls, path):
+        ownership = cls()
+        os.utime(path)
+        with open(path, "r") as f:
+            for font in json.load(f)["fonts"]:
+                ownership.names.append(font["name"])
+                ownership.shas.append(font["sha"])
+                ownership.masks.append(cls.fromRanges(font["codepoints"]))
+                ownership.owned.append(cls.fromRanges(font["owned"]))
+        return ownership
+
+    def coverage(self):
+        """ [(Unicode block, [(font, codepoints it supplies), …]), …] of
+            the blocks the build covers.
+        """
+        report = []
+        for i, block in enumerate(Blocks.VALUES):
+            first = Blocks.RANGES[i]
+            last = Blocks.RANGES[i + 1] - 1 if i + 1 < len(Blocks.RANGES) else 0x10FFFF
+            if block == "No_Block":
+                continue
+            blockMask = ((1 << (last - first + 1)) - 1) << first
+            fonts = []
+            for name, owned in zip(self.names, self.owned):
+                count = bin(owned & blockMask).count("1")
+                if count > 0:
+                    fonts.append((name, count))
+            if len(fonts) > 0:
+                report.append((block, fonts))
+        return report
+
+    @staticmethod
+    def fromRanges(ranges):
+        bits = []
+        position = 0
+        for first, last in sorted(ranges):
+            if last < position:
+                continue
+            first = max(first, position)
+            bits.append("0" * (first - position) + "1" * (last - first + 1))
+            position = last + 1
+        return int("".join(bits)[::-1] or "0", 2)
+
+    @staticmethod
+    def toRanges(mask):
+        return [(m.start(), m.end() - 1) for m in re.finditer("1+", bin(mask)[:1:-1])]
+
+    @classmethod
+    def toCodepoints(cls, mask):
+        return [u for first, last in cls.toRanges(mask) for u in range(first, last + 1)]
+
+    def removed(self, i):
+        """ Codepoints of the font i that an earlier font owns.
+        """
+        return self.masks[i] & ~self.owned[i]
+
+
+class UnicodeRanges:
+    """ Presets defined by codepoint ranges instead of glyph names, so
+        they do not depend on the glyph naming of the fonts. An
+        expression is a sequence of terms joined by + (union), &
+        (intersection) or - (difference), read from left to right:
+            BasicLatin + BasicGreek - U+00D7 & U+0000-00FF
+        A term is a preset below, a Unicode block name (Tamil,
+        LatinExtended-A, …) or a U+XXXX / U+XXXX-YYYY range. The result
+        is a bitset, like the ones of Ownership.
+    """
+
+    presets = {
+        "BasicLatin": [
+            (0x0020, 0x007E), (0x00A0, 0x00FF), (0x0131, 0x0131),
+            (0x0152, 0x0153), (0x02C6, 0x02C6), (0x02DA, 0x02DA),
+            (0x02DC, 0x02DC), (0x2013, 0x2014), (0x2018, 0x201A),
+            (0x201C, 0x201E), (0x2022, 0x2022), (0x2026, 0x2026),
+            (0x2039, 0x203A), (0x20AC, 0x20AC), (0x2122, 0x2122),
+            ],
+        "ExtendedLatin": [
+            (0x0020, 0x007E), (0x00A0, 0x024F), (0x02B0, 0x036F),
+            (0x1E00, 0x1EFF), (0x2000, 0x206F), (0x20A0, 0x20CF),
+            (0x2122, 0x2122),
+            ],
+        "UnicodeLatin": [
+            (0x0020, 0x007E), (0x00A0, 0x036F), (0x1D00, 0x1DBF),
+            (0x1E00, 0x1EFF), (0x2000, 0x206F), (0x2070, 0x209F),
+            (0x20A0, 0x20CF), (0x2100, 0x214F), (0x2C60, 0x2C7F),
+            (0xA720, 0xA7FF), (0xAB30, 0xAB6F), (0xFB00, 0xFB06),
+            ],
+        "BasicGreek": [(0x0370, 0x03FF)],
+        "ExtendedGreek": [(0x0370, 0x03FF), (0x1F00, 0x1FFF)],
+        "BasicCyrillic": [(0x0400, 0x045F), (0x0490, 0x0491)],
+        "ExtendedCyrillic": [
+            (0x0400, 0x052F), (0x1C80, 0x1C8F), (0x2DE0, 0x2DFF), (0xA640, 0xA69F),
+            ],
+        }
+
+    operators = {
+        "+": lambda a, b: a | b,
+        "|": lambda a, b: a | b,
+        "&": lambda a, b: a & b,
+        "-": lambda a, b: a & ~b,
+        }
+
+    @staticmethod
+    def normalize(name):
+        return re.sub("[ _-]", "", name).lower()
+
+    @classmethod
+    def term(cls, token):
+        match = re.fullmatch("[Uu]\\+([0-9A-Fa-f]{1,6})(?:-(?:[Uu]\\+)?([0-9A-Fa-f]{1,6}))?", token)
+        if match is not None:
+            first = int(match.group(1), 16)
+            last = int(match.group(2), 16) if match.group(2) else first
+            return Ownership.fromRanges([(first, last)])
+        if token in cls.presets:
+            return Ownership.fromRanges(cls.presets[token])
+        for i, block in enumerate(Blocks.VALUES):
+            if block != "No_Block" and cls.normalize(block) == cls.normalize(token):
+                last = Blocks.RANGES[i + 1] - 1 if i + 1 < len(Blocks.RANGES) else 0x10FFFF
+                return Ownership.fromRanges([(Blocks.RANGES[i], last)])
+        raise ValueError("Unknown Unicode preset: " + token)
+
+    @staticmethod
+    def fromText(text):
+        return Ownership.fromRanges([(ord(c), ord(c)) for c in text])
+
+    @classmethod
+    def parse(cls, expression):
+        """ Bitset of an expression, given as a string or as a list of
+            command line arguments.
+        """
+        if not isinstance(expression, str):
+            expression = " ".join(expression)
+        tokens = expression.split()
+        if len(tokens) == 0 or len(tokens) % 2 == 0:
+            raise ValueError("Incomplete Unicode expression: " + expression)
+        mask = cls.term(tokens[0])
+        for operator, token in zip(tokens[1::2], tokens[2::2]):
+            if operator not in cls.operators:
+                raise ValueError("Unknown operator " + operator + " in " + expression)
+            mask = cls.operators[operator](mask, cls.term(token))
+        return mask
+
 
 class GlyphsToRemove:
 
@@ -205,6 +2528,12 @@ class GlyphsToRemove:
         return self.writingSys2glifToRemove
 
 
+class GlyphLimitError(ValueError):
+    """ The asked scripts can't be split in fonts of at most
+        Notobuilder.glyphLimit glyphs.
+    """
+
+
 class Notobuilder:
     """ docstring
     """
@@ -225,7 +2554,14 @@ class Notobuilder:
         metrics,
         compatibility,
         subset,
-        version
+        version,
+        jobs=8,
+        source="github",
+        prefetch=False,
+        coverage=False,
+        unicodes=None,
+        cache=True,
+        memoryBudget=None
     ):
         self.scriptsFolder = os.path.split(sys.argv[0])[0]
         self.notoFontsFolder = os.path.join(self.scriptsFolder, "NotoFonts")
@@ -242,7 +2578,6 @@ class Notobuilder:
         self.default = []
         self.toKeep = dict()
         self.hinted = hinted
-        self.uniGlyphsAlreadySorted = list()
         self.path = "instance_ttf"
         self.ui = ui
         self.version = version[0]
@@ -253,6 +2588,34 @@ class Notobuilder:
             self.metrics = metrics
         self.compatibility = compatibility
         self.subset = subset
+        self.jobs = jobs
+        self.source = source
+        self.prefetch = prefetch
+        self.coverage = coverage
+        self.unicodes = unicodes
+        self.cache = cache
+        self.memoryBudget = memoryBudget
+        # codepoints the fonts are reduced to before merging: the asked
+        # --unicodes and the characters of --subset
+        self.keptCodepoints = unicodes
+        if self.subset != "":
+            text = UnicodeRanges.fromText(self.subset[0] + chr(0) + chr(13) + chr(32))
+            if self.keptCodepoints is None:
+                self.keptCodepoints = text
+            else:
+                self.keptCodepoints &= text
+        self.fontCache = FontCache()
+        self.fontIndex = FontIndex(self.notoFontsFolder, self.fontCache)
+        self.subsetCache = SubsetCache(self.notoFontsFolder)
+        self.mergeCache = MergeCache(self.notoFontsFolder)
+        self.scaledCache = ScaledCache(self.notoFontsFolder, self.fontIndex, self.fontCache)
+        self.mergeKeys = dict()
+        self.styleKey = None
+        self.subsetPool = None
+        self.firstStyle = None
+        self.fonts2merge_list = []
+        self.tempStyle = ""
+        self.presetIndex = PresetIndex(os.path.join(self.scriptsFolder, "subsets"))
         # self.unhintedfontpath = "fonts/ttf/unhinted/instance_ttf"
         # self.hintedfontpath = "fonts/ttf/hinted/instance_ttf"
         self.lgcfonts = [
@@ -328,31 +2691,267 @@ class Notobuilder:
 
         #1. FIND THE REPO NAME
         self.buildRepoName()
-        #2. DOWNLOAD FONTS AND SWITCH CONTRAST STYLE IF NEEDED
-        dl = Download(self.repoNames, self.scriptsFolder, self.hinted)
-        dl.dwnldFonts()
+        #2. LIST THE REPOSITORIES AND SWITCH CONTRAST STYLE IF NEEDED
+        dl = Download(
+            self.repoNames, self.scriptsFolder, self.hinted, self.jobs, self.source, self.fontIndex
+            )
+        dl.resolveRepos()
         self.repoNames = dl.getEditedRepoNames()
+        self.lgcRepoNames = [
+            dl.resolvedNames[n] for n in self.lgcRepoNames if n in dl.resolvedNames
+            ]
+        self.availableStyles = StyleIndex({n: dl.availableFonts(n) for n in self.repoNames})
         #3. BUILD ALL WIDTH-WEIGHT STYLE NAME
         self.buildWghtWdthstyleName()
-        #4. FOR EACH STYLE ASKED : (e.g. Bold, then CondensedBold, etc.)
-        for s in self.wghtwdth_styles:
-            # 4.a find the fonts thaht matches the style
-            self.buildFonts2mergeList(s)
-            # 4b. SUBSET LATIN / GREEK / CYRILLIC IF NEEDED
-            self.lgcSub()
-            #4c. SUBSET ARABIC IF NEEDED
-            if "Arabic" in self.writingSystems:
-                if "BasicArabic" in self.preset:
-                    for ar in self.repoNames:
-                        if ar in self.arabicFamilies:
-                            self.arabicSub(ar)
-            #4d. RESOLVE DUPLICATES IF IT'S NOT ALREADY DONE
-            if self.duplicatesAreResolved is False:
+        wanted = self.neededFonts()
+        #3b. SPLIT THE SCRIPTS IN SEVERAL FAMILIES IF THERE ARE TOO MANY GLYPHS
+        parts = [self.repoNames]
+        if self.prefetch is False:
+            counts = dl.glyphCounts(wanted)
+            counts.update(self.lgcGlyphCounts(dl, wanted))
+            parts = self.planParts(counts)
+        #3c. DOWNLOAD ONLY THE FONTS THESE STYLES NEED
+        dl.dwnldFonts(wanted)
+        self.styleIndex = StyleIndex.fromCache(self.notoFontsFolder, self.repoNames, self.path)
+        if self.prefetch is True:
+            manifest = Manifest(self.notoFontsFolder)
+            manifest.update(dl.manifestEntries())
+            manifest.save()
+            return
+        # the styles can be built in forked processes: no connection
+        # must be left open
+        dl.close()
+        newName = self.newName
+        try:
+            for i, part in enumerate(parts):
+                if len(parts) > 1:
+                    self.newName = newName + " " + str(i + 1)
+                    print("> Build", self.newName, "with", ", ".join(part))
+                self.repoNames = part
+                self.duplicatesAreResolved = False
+                #4. FOR EACH STYLE ASKED : (e.g. Bold, then CondensedBold, etc.)
+                self.buildStyles()
+        finally:
+            self.closeSubsetPool()
+        self.newName = newName
+        stats = self.fontCache.stats()
+        print("INFO: font cache:", stats["hits"], "hits,", stats["misses"], "misses,",
+            stats["evictions"], "evictions,", stats["fonts"], "fonts and",
+            stats["compiledBytes"], "compiled bytes held"
+            )
+        print("INFO: subset cache:", self.subsetCache.hits, "hits,",
+            self.subsetCache.misses, "misses"
+            )
+        if self.cache is True:
+            print("INFO: merge cache:", self.mergeCache.hits, "hits,",
+                self.mergeCache.misses, "misses"
+                )
+
+    # glyph IDs of a TrueType font are 16 bits
+    glyphLimit = 65535
+
+    def lgcGlyphCounts(self, dl, wanted):
+        """ The glyph count of the biggest Latin, Greek and Cyrillic font
+            of each repository once subset by lgcSub, the layout closure
+            included: these fonts are downloaded before the other ones
+            and subset now, the subset cache gives them back to lgcSub.
+            Empty if they are kept whole.
+        """
+        glyphs = self.lgcGlyphs()
+        lgc = [n for n in self.lgcRepoNames if n in wanted]
+        if glyphs is None or len(lgc) == 0:
+            return dict()
+        dl.dwnldFonts({n: wanted[n] for n in lgc})
+        styleIndex = StyleIndex.fromCache(self.notoFontsFolder, lgc, self.path)
+        counts = dict()
+        for n in lgc:
+            ftpaths = [styleIndex.find(n, self.fontCandidates(n, s)) for s in self.wghtwdth_styles]
+            ftpaths = sorted(set(self.normalized(p) for p in ftpaths if p is not None))
+            names = self.cachedSubsets([
+                (ftpath, "EuropeanSubset", self.subsetterOptions(), glyphs, ())
+                for ftpath in ftpaths
+                ])
+            counts[n] = max([0] + [self.fontIndex.glyphCount(name) for name in names])
+            self.fontCache.release(names)
+        return counts
+
+    def planParts(self, counts):
+        """ Predict the glyph count of the merged fonts from counts, the
+            glyph count of the biggest font of each repository in the
+            asked styles (the Latin, Greek and Cyrillic ones once subset,
+            the duplicates and the other subsets can only remove glyphs).
+            If the sum is over glyphLimit, the other repositories are
+            packed, biggest first, into the first part where they fit
+            next to the Latin, Greek and Cyrillic ones, that are in every
+            part. Returns the repositories of each part.
+        """
+        counts = {n: counts.get(n, 0) for n in self.repoNames}
+        if sum(counts.values()) <= self.glyphLimit:
+            return [self.repoNames]
+        lgc = [n for n in self.repoNames if n in self.lgcRepoNames]
+        budget = self.glyphLimit - sum(counts[n] for n in lgc)
+        if budget < 0:
+            raise GlyphLimitError(
+                ", ".join(lgc) + " have " + str(sum(counts[n] for n in lgc))
+                + " glyphs, more than the " + str(self.glyphLimit) + " a font can hold"
+                )
+        for n in self.repoNames:
+            if n not in lgc and counts[n] > budget:
+                message = (n + " has " + str(counts[n]) + " glyphs, more than the "
+                    + str(budget) + " a font can hold")
+                if len(lgc) > 0:
+                    message += " next to " + ", ".join(lgc)
+                raise GlyphLimitError(message)
+        parts = []
+        for n in sorted(self.repoNames, key=lambda n: -counts[n]):
+            if n in lgc:
+                continue
+            for part in parts:
+                if part[0] + counts[n] <= budget:
+                    part[0] += counts[n]
+                    part[1].add(n)
+                    break
+            else:
+                parts.append([counts[n], {n}])
+        print("INFO: about", sum(counts.values()), "glyphs, more than", self.glyphLimit,
+            "the scripts are split in", len(parts), "families"
+            )
+        # the repositories keep their order: the first font that maps a
+        # codepoint keeps it
+        return [[n for n in self.repoNames if n in lgc or n in part[1]] for part in parts]
+
+    def buildStyle(self, s):
+        # 4.a find the fonts thaht matches the style
+        self.buildFonts2mergeList(s)
+        self.styleKey = self.mergeKeys.get(s)
+        if self.styleKey is not None:
+            self.destination = os.path.join(self.scriptsFolder, "Custom_Fonts")
+            if not os.path.exists(self.destination):
+                os.makedirs(self.destination)
+            outputs = self.mergeCache.get(self.styleKey, self.destination)
+            if outputs is not None:
+                for output in outputs:
+                    print("    INFO:", output, "taken from the merge cache")
+                print()
+                return
+        # 4b. SUBSET LATIN / GREEK / CYRILLIC, AND ARABIC IF NEEDED
+        self.subsetScripts()
+        #4d. RESOLVE DUPLICATES IF IT'S NOT ALREADY DONE
+        if self.duplicatesAreResolved is False:
+            if s == self.firstStyle:
                 self.resolveDuplicate()
-            #4e. REMOVE DUPLICATES
-            self.prepFontsForMerging()
-            #4f. ACTUALLY MERGE AND RENAME FONTS
-            self.merging()
+            else:
+                self.resolveFirstStyle()
+        #4e. REMOVE DUPLICATES
+        self.prepFontsForMerging()
+        #4f. ACTUALLY MERGE AND RENAME FONTS
+        self.merging()
+
+    def subsetScripts(self):
+        self.lgcSub()
+        if "Arabic" in self.writingSystems:
+            if "BasicArabic" in self.preset:
+                for ar in self.repoNames:
+                    if ar in self.arabicFamilies:
+                        self.arabicSub(ar)
+
+    def resolveFirstStyle(self):
+        """ Resolve the duplicates on the fonts of the first style, the
+            same for every style, whatever the style being built (the
+            first one can come from the merge cache).
+        """
+        state = (self.fonts2merge_list, self.tempStyle)
+        self.tempStyle = self.firstStyle.replace("-", "")
+        self.fonts2merge_list = [self.normalized(ftpath) for ftpath in self.styleSources(self.firstStyle)]
+        self.subsetScripts()
+        self.resolveDuplicate()
+        self.fonts2merge_list, self.tempStyle = state
+
+    def buildStyles(self):
+        """ Build the first style here: it resolves the duplicates for
+            all of them. The next ones are built in a pool of at most
+            self.jobs forked processes, each with its own copy of the
+            builder, and their logs are printed in the order of the
+            styles.
+        """
+        global styleBuilder
+        styles = list(self.wghtwdth_styles)
+        if len(styles) == 0:
+            return
+        self.firstStyle = styles[0]
+        if self.cache is True:
+            self.mergeKeys = {s: self.mergeKey(s, styles[0]) for s in styles}
+        if self.coverage is True and self.duplicatesAreResolved is False:
+            # the report does not depend on the merge cache
+            self.resolveFirstStyle()
+        self.buildStyle(styles[0])
+        styles = styles[1:]
+        if len(styles) < 2 or self.jobs < 2 or "fork" not in multiprocessing.get_all_start_methods():
+            for s in styles:
+                self.buildStyle(s)
+            return
+        styleBuilder = self
+        context = multiprocessing.get_context("fork")
+        self.fontIndex.close()
+        # nor can the subset pool be used from a forked process
+        self.closeSubsetPool()
+        try:
+            with ProcessPoolExecutor(
+                max_workers=min(self.jobs, len(styles)), mp_context=context,
+                initializer=initStyleWorker
+                ) as pool:
+                futures = [pool.submit(buildStyleInWorker, s) for s in styles]
+                for future in futures:
+                    try:
+                        log, counters = future.result()
+                    except Exception as e:
+                        # what the worker printed before it failed
+                        print(getattr(e, "styleLog", ""), end="")
+                        raise
+                    print(log, end="")
+                    self.addCacheCounters(counters)
+        finally:
+            styleBuilder = None
+            self.fontIndex.connect()
+
+    def cacheCounters(self):
+        return [
+            self.fontCache.hits, self.fontCache.misses, self.fontCache.evictions,
+            self.subsetCache.hits, self.subsetCache.misses,
+            self.mergeCache.hits, self.mergeCache.misses
+            ]
+
+    def addCacheCounters(self, counters):
+        self.fontCache.hits += counters[0]
+        self.fontCache.misses += counters[1]
+        self.fontCache.evictions += counters[2]
+        self.subsetCache.hits += counters[3]
+        self.subsetCache.misses += counters[4]
+        self.mergeCache.hits += counters[5]
+        self.mergeCache.misses += counters[6]
+
+    def mergeKey(self, s, first):
+        """ The key of the merged fonts of the style s in the merge
+            cache: the builder itself, the fontTools version, the preset
+            files, the fonts of s and of the first style (they resolve
+            the duplicates) and every option that changes the output.
+        """
+        keptCodepoints = None
+        if self.keptCodepoints is not None:
+            keptCodepoints = Ownership.toRanges(self.keptCodepoints)
+        return MergeCache.key([
+            builderSha(),
+            fontToolsVersion,
+            self.presetIndex.contentShas(),
+            [[os.path.basename(p), self.fontIndex.sha(p)] for p in self.styleSources(s)],
+            [[os.path.basename(p), self.fontIndex.sha(p)] for p in self.styleSources(first)],
+            [
+                self.newName, s, self.italic, self.output, self.writingSystems,
+                self.contrast, self.styles, self.preset, self.swapedstyles,
+                self.hinted, self.ui, self.metrics, self.compatibility,
+                self.subset, keptCodepoints, self.version,
+                ],
+            ])
 
     @property
     def monospaced(self):
@@ -400,61 +2999,61 @@ class Notobuilder:
         if len(set(self.preset) & set(lgcPresets[writingsystem])) == 0:
             self.preset.append(lgcPresets[writingsystem][0])
 
+        source = os.path.basename(jsonpath)
         for askedPreset in self.preset:
             if askedPreset in lgcPresets[writingsystem]:
-                with open(jsonpath, "r") as subsetDict:
-                    subset = json.load(subsetDict)
-                for subName in subset:
-                    if subName == askedPreset:
-                        for g in subset[askedPreset]:
-                            if g not in self.panEuropeanSub:
-                                self.panEuropeanSub.append(g)
+                if askedPreset in self.presetIndex.presets(source):
+                    self.panEuropeanSub |= self.presetIndex.glyphs(source, askedPreset)
 
 
-    def lgcSub(self):
-        if len(self.swapedstyles) > 0:
-            self.swaper() # fisrt apply the stylistic changes
-        self.panEuropeanSub = []
+    def lgcGlyphs(self):
+        """ The glyphs of the asked presets kept in the Latin, Greek and
+            Cyrillic fonts, or None if they are kept whole.
+        """
+        self.panEuropeanSub = set()
         lgcSub = [s for s in self.writingSystems if s in ["Latin", "Greek", "Cyrillic"]]
+        if self.unicodes is not None and len(self.preset) == 0:
+            # the asked codepoints replace the default glyph presets
+            lgcSub = []
         if 0 < len(lgcSub) < 3 and "Full" not in self.preset:
-            europeanSubsetFolder = os.path.join(self.notoFontsFolder, "EuropeanSubset")
-            if not os.path.exists(europeanSubsetFolder):
-                os.makedirs(europeanSubsetFolder)
             for script in lgcSub:
                 self.readJson(
                     os.path.join(self.scriptsFolder, "subsets", script.lower() + "_subsets.json"), script)
-            for ftpath in self.fonts2merge_list:
-                if os.path.basename(ftpath).split("-")[0] in self.lgcfonts:
-                    font = self.subsetter(ttLib.TTFont(ftpath), self.panEuropeanSub)
-                    newpath = os.path.join(
-                        europeanSubsetFolder, os.path.basename(ftpath)
-                        )
-                    font.save(newpath)
-                    self.fonts2merge_list = self.listReplacer(ftpath, newpath, self.fonts2merge_list)
+            return self.panEuropeanSub
+        return None
 
-    def arabicSub(self, repoName):
-        self.arabicSub = []
-        with open(os.path.join(self.scriptsFolder, "subsets", repoName+"_subsets.json"), "r") as subsetDict:
-            subset = json.load(subsetDict)
-            for g in subset["BasicArabic"]:
-                if g not in self.arabicSub:
-                    self.arabicSub.append(g)
-
-        arabicSubsetFolder = os.path.join(self.notoFontsFolder, "ArabicSubset")
-        if not os.path.exists(arabicSubsetFolder):
-            os.makedirs(arabicSubsetFolder)
-
-        for ftpath in self.fonts2merge_list:
-            if os.path.basename(ftpath).split("-")[0] in self.arabicFamilies:
-                font = self.arabicSubsetter(ttLib.TTFont(ftpath), self.arabicSub)
-                newpath = os.path.join(
-                        arabicSubsetFolder, os.path.basename(ftpath)
-                        )
-                font.save(newpath)
+    def lgcSub(self):
+        if len(self.swapedstyles) > 0:
+            self.swaper() # fisrt apply the stylistic changes
+        if self.lgcGlyphs() is not None:
+            ftpaths = [
+                ftpath for ftpath in self.fonts2merge_list
+                if os.path.basename(ftpath).split("-")[0] in self.lgcfonts
+                ]
+            newpaths = self.cachedSubsets([
+                (ftpath, "EuropeanSubset", self.subsetterOptions(), self.panEuropeanSub, ())
+                for ftpath in ftpaths
+                ])
+            for ftpath, newpath in zip(ftpaths, newpaths):
                 self.fonts2merge_list = self.listReplacer(ftpath, newpath, self.fonts2merge_list)
 
+    def arabicSub(self, repoName):
+        self.arabicGlyphs = set(self.presetIndex.glyphs(repoName + "_subsets.json", "BasicArabic"))
+
+        ftpaths = [
+            ftpath for ftpath in self.fonts2merge_list
+            if os.path.basename(ftpath).split("-")[0] in self.arabicFamilies
+            ]
+        newpaths = self.cachedSubsets([
+            (ftpath, "ArabicSubset", self.arabicSubsetterOptions(), self.arabicGlyphs, ())
+            for ftpath in ftpaths
+            ])
+        for ftpath, newpath in zip(ftpaths, newpaths):
+            self.fonts2merge_list = self.listReplacer(ftpath, newpath, self.fonts2merge_list)
+
     def buildRepoName(self):
         self.repoNames = []
+        self.lgcRepoNames = []
         for script in self.writingSystems:
             if script in ["Latin", "Greek", "Cyrillic"]:
                 name = (
@@ -477,6 +3076,8 @@ class Notobuilder:
                 name = self.repo_naming_translation[name]
             if self.ui is True and name in self.fonts_with_ui_version:
                 name = name + "UI"
+            if script in ["Latin", "Greek", "Cyrillic"] and name not in self.lgcRepoNames:
+                self.lgcRepoNames.append(name)
             if name not in self.repoNames:
                 self.repoNames.append(name)
         if "ExtendedTamil" in self.preset:
@@ -488,11 +3089,7 @@ class Notobuilder:
             common = set()
             family2weightwidth = dict()
             for family in self.repoNames:
-                repoPath = os.path.join(self.notoFontsFolder, family, self.path)
-                weightwidth = list()
-                for ft in os.listdir(repoPath):
-                    weightwidth.append(ft.split("-")[1].replace(".ttf", ""))
-                family2weightwidth[family] = weightwidth
+                family2weightwidth[family] = self.availableStyles.styleNames(family)
             common = set(family2weightwidth[self.repoNames[0]])
             for i in family2weightwidth:
                 common = common & set(family2weightwidth[i])
@@ -508,186 +3105,149 @@ class Notobuilder:
                     else:
                         self.wghtwdth_styles.append(wdth + "-" +wght)
 
-    def buildFonts2mergeList(self, s):
-        fallback = False
-        localisation = 8
+    def fontCandidates(self, n, s):
+        """ Paths of the fonts of the repository n that can be used for
+            the style s, by order of preference: the asked style, then
+            the nearest weights in the same width, then without width.
+        """
         typographicStyles = ["Black", "Bold", "SemiBold",
                 "Medium", "Regular", "Light",
                 "SemiLight", "Light", "Thin", "Regular"
                 ]
+        tempStyle = s.replace("-", "")
+        ftname = "-".join([n, tempStyle]) + ".ttf"
+        if "Italic" in ftname:
+            old = "-Italic-" + tempStyle
+            new = "-" + tempStyle + "Italic"
+            ftname = ftname.replace(
+                old, new.replace("Regular", "")
+            )  # remove Reg in the Italic case)
+        candidates = [ftname]
+        localisation = 8
+        if "-" in s: #width incompatibility
+            extractedWidth = s.split("-")[0]
+            if s.split("-")[1] in typographicStyles:
+                localisation = typographicStyles.index(s.split("-")[1])
+            for styl in typographicStyles[localisation:]:
+                candidates.append(ftname.replace(tempStyle, extractedWidth+styl))
+            candidates.append(ftname.replace(extractedWidth, ""))
+            for styl in typographicStyles[localisation:]:
+                candidates.append(ftname.replace(tempStyle, styl))
+        else:
+            if s in typographicStyles:
+                localisation = typographicStyles.index(s)
+            for styl in typographicStyles[localisation:]:
+                candidates.append(ftname.replace(s, styl))
+        folder = os.path.join(self.notoFontsFolder, n, self.path)
+        return [os.path.join(folder, c) for c in candidates]
+
+    def neededFonts(self):
+        """ For each repository, the candidates of every asked style.
+        """
+        needed = dict()
+        for n in self.repoNames:
+            needed[n] = [
+                [
+                    self.availableStyles.name(n, c) for c in self.fontCandidates(n, s)
+                    if self.availableStyles.name(n, c) is not None
+                    ]
+                for s in self.wghtwdth_styles
+                ]
+        return needed
+
+    def buildFonts2mergeList(self, s):
         # for s in self.wghtwdth_styles:
         print("> Gather fonts to build", self.newName, s)
         self.tempStyle = s.replace("-", "")
         self.fonts2merge_list = []
         # print("> The followings fonts can be merged:")
         for n in self.repoNames:
-            ftname = "-".join([n, self.tempStyle]) + ".ttf"
-            if "Italic" in ftname:
-                old = "-Italic-" + self.tempStyle
-                new = "-" + self.tempStyle + "Italic"
-                ftname = ftname.replace(
-                    old, new.replace("Regular", "")
-                )  # remove Reg in the Italic case)
-            ftpath = os.path.join(self.notoFontsFolder, n, self.path, ftname)
-            if Path(ftpath).exists():
+            candidates = self.fontCandidates(n, s)
+            ftpath = self.styleIndex.find(n, candidates)
+            if ftpath is None:
+                continue
+            if os.path.basename(ftpath) == os.path.basename(candidates[0]):
                 print("  ✓", os.path.basename(ftpath))
-                self.fonts2merge_list.append(ftpath)
             else:
-                if "-" in s: #width incompatibility
-                    extractedWidth = s.split("-")[0]
-
-                    fallback = False
-                    if s.split("-")[1] in typographicStyles:
-                        localisation = typographicStyles.index(s.split("-")[1])
-                    for styl in typographicStyles[localisation:]:
-                        if fallback is False:
-                            if os.path.isfile(
-                                os.path.join(
-                                    os.path.dirname(ftpath),
-                                    os.path.basename(ftpath.replace(self.tempStyle, extractedWidth+styl)),
-                                )
-                            ):
-                                self.fonts2merge_list.append(
-                                    ftpath.replace(
-                                        ftpath,
-                                        os.path.join(
-                                            os.path.dirname(ftpath),
-                                            os.path.basename(
-                                                ftpath.replace(self.tempStyle, extractedWidth+styl)
-                                            ),
-                                        ),
-                                    )
-                                )
-                                print(
-                                    "  ✓",
-                                    os.path.basename(ftpath.replace(self.tempStyle, extractedWidth+styl)),
-                                    "[FALLBACK]",
-                                )
-                                fallback = True
-
-                    if fallback is False:
-                        if os.path.isfile(
-                            os.path.join(
-                                os.path.dirname(ftpath),
-                                os.path.basename(ftpath.replace(extractedWidth, "")),
-                            )
-                        ):
-                            self.fonts2merge_list.append(ftpath.replace(extractedWidth, ""))
-                            print(
-                                "  ✓",
-                                os.path.basename(ftpath.replace(extractedWidth, "")),
-                                "[FALLBACK]",
-                            )
-                        else:
-                            fallback = False
-                            if s.split("-")[1] in typographicStyles:
-                                localisation = typographicStyles.index(s.split("-")[1])
-                            for styl in typographicStyles[localisation:]:
-                                if fallback is False:
-                                    if os.path.isfile(
-                                        os.path.join(
-                                            os.path.dirname(ftpath),
-                                            os.path.basename(ftpath.replace(self.tempStyle, styl)),
-                                        )
-                                    ):
-                                        self.fonts2merge_list.append(
-                                            ftpath.replace(
-                                                ftpath,
-                                                os.path.join(
-                                                    os.path.dirname(ftpath),
-                                                    os.path.basename(
-                                                        ftpath.replace(self.tempStyle, styl)
-                                                    ),
-                                                ),
-                                            )
-                                        )
-                                        print(
-                                            "  ✓",
-                                            os.path.basename(ftpath.replace(self.tempStyle, styl)),
-                                            "[FALLBACK]",
-                                        )
-                                        fallback = True
-                else:
-                    localisation = 8
-                    fallback = False
-                    if s in typographicStyles:
-                        localisation = typographicStyles.index(s)
-                    for styl in typographicStyles[localisation:]:
-                        if fallback is False:
-                            if os.path.isfile(
-                                os.path.join(
-                                    os.path.dirname(ftpath),
-                                    os.path.basename(ftpath.replace(s, styl)),
-                                )
-                            ):
-                                self.fonts2merge_list.append(
-                                    ftpath.replace(
-                                        ftpath,
-                                        os.path.join(
-                                            os.path.dirname(ftpath),
-                                            os.path.basename(
-                                                ftpath.replace(s, styl)
-                                            ),
-                                        ),
-                                    )
-                                )
-                                print(
-                                    "  ✓",
-                                    os.path.basename(ftpath.replace(s, styl)),
-                                    "[FALLBACK]",
-                                )
-                                fallback = True
-
-    def ft2uni(self):
-        ft2unilist = dict()
-        for ftpath in self.fonts2merge_list:
-            f = ttLib.TTFont(ftpath)
-            uni_list = list()
-            cmap = f["cmap"].tables
-            for table in cmap:
-                if table.platformID == 3:
-                    for uni, name in table.cmap.items():
-                        if uni not in uni_list:
-                            uni_list.append(uni)
-            ft2unilist[ftpath] = uni_list
-        return ft2unilist
+                print("  ✓", os.path.basename(ftpath), "[FALLBACK]")
+            self.fonts2merge_list.append(self.normalized(ftpath))
+
+    def normalized(self, ftpath):
+        """ The font at 1000 UPM.
+        """
+        if self.upm(ftpath) != ScaledCache.upm:
+            return self.scaledCache.get(ftpath)
+        return ftpath
+
+    def styleSources(self, s):
+        """ The fonts buildFonts2mergeList finds for the style s.
+        """
+        sources = []
+        for n in self.repoNames:
+            ftpath = self.styleIndex.find(n, self.fontCandidates(n, s))
+            if ftpath is not None:
+                sources.append(ftpath)
+        return sources
 
     def resolveDuplicate(self):
+        """ A codepoint is kept in the first font that maps it and removed
+            from the next ones.
+        """
         self.duplicatedToRemove = GlyphsToRemove()
-        fonts2test = copy.deepcopy(self.fonts2merge_list)
-        ft2unilist = self.ft2uni()
         self.script2warnSubset = dict()
-
-        uniNaming = ["", "U+000", "U+00", "U+0", "U+"]
-
-        while len(fonts2test) > 1:
-            for i in fonts2test[1:]:
-                ft2uni_temp = dict()
-                ft2uni_temp[fonts2test[0]] = ft2unilist[fonts2test[0]]
-                ft2uni_temp[i] = ft2unilist[i]
-                identicAlreadyDone, duplicates = self.getIdentic(ft2uni_temp)
-                if len(identicAlreadyDone) != 0:
-                    self.duplicatedToRemove.addGlyphToRemove(
-                        identicAlreadyDone, os.path.basename(i).split("-")[0]
-                        )
-                if len(duplicates) != 0:
-                    removedUni = []
-                    for d in set(duplicates+identicAlreadyDone):
-                        u = str(hex(d)).upper()[2:]
-                        uni = uniNaming[len(u)] + u
-                        removedUni.append(uni)
-                    warnSubset = "    WARN: " + " ".join(removedUni) + " are removed from " + os.path.basename(i)
-                    # print(warnSubset)
-                    self.script2warnSubset[os.path.basename(i).split("-")[0]] = warnSubset
+        shas = [self.fontIndex.sha(ftpath) for ftpath in self.fonts2merge_list]
+        ownershipPath = os.path.join(
+            self.notoFontsFolder, "ownership", Ownership.key(shas) + ".json"
+            )
+        if os.path.exists(ownershipPath):
+            ownership = Ownership.load(ownershipPath)
+        else:
+            ownership = Ownership([
+                (os.path.basename(ftpath), sha, self.fontIndex.ranges(ftpath))
+                for ftpath, sha in zip(self.fonts2merge_list, shas)
+                ])
+            ownership.save(ownershipPath)
+        if self.keptCodepoints is not None:
+            for i, ftpath in enumerate(self.fonts2merge_list):
+                notAsked = ownership.masks[i] & ~self.keptCodepoints
+                if notAsked != 0:
                     self.duplicatedToRemove.addGlyphToRemove(
-                        duplicates, os.path.basename(i).split("-")[0]
+                        ownership.toCodepoints(notAsked), os.path.basename(ftpath).split("-")[0]
                         )
-            del fonts2test[0]
+        if self.coverage is True:
+            self.printCoverage(ownership)
+
+        sharedTwice = 0
+        for i in range(1, len(self.fonts2merge_list)):
+            removed = ownership.removed(i)
+            if removed == 0:
+                continue
+            family = os.path.basename(self.fonts2merge_list[i]).split("-")[0]
+            self.duplicatedToRemove.addGlyphToRemove(ownership.toCodepoints(removed), family)
+            # warn about the last earlier font that shares codepoints
+            # with this one no other font had shared yet
+            new = removed & ~sharedTwice
+            sharedTwice |= removed
+            heads = [j for j in range(i) if new & ownership.owned[j]]
+            if len(heads) != 0:
+                shared = ownership.masks[heads[-1]] & ownership.masks[i]
+                removedUni = []
+                for d in ownership.toCodepoints(shared):
+                    removedUni.append("U+" + str(hex(d)).upper()[2:].zfill(4))
+                warnSubset = "    WARN: " + " ".join(removedUni) + " are removed from " + os.path.basename(self.fonts2merge_list[i])
+                self.script2warnSubset[family] = warnSubset
         self.duplicatesAreResolved = True
 
+    def printCoverage(self, ownership):
+        print("> Unicode blocks of", self.newName)
+        for block, fonts in ownership.coverage():
+            print("  " + block + ":", ", ".join(
+                [name + " (" + str(count) + ")" for name, count in fonts]
+                ))
+
     def population(self, path, script2glifToDel):
         populate = []
-        uniToremove = [i for i in script2glifToDel[os.path.basename(path).split("-")[0]]]
+        uniToremove = set(script2glifToDel[os.path.basename(path).split("-")[0]])
         uni2glyphname = self.uni2glyphname(path)
         for uni in uni2glyphname:
             if uni not in uniToremove:
@@ -701,39 +3261,59 @@ class Notobuilder:
 
         glifToRemove = self.duplicatedToRemove.getDict()
 
-        self.actualFonts2merge = list()
-        self.subsettedFonts2remove = list()
+        subsets = list()
         for path in self.fonts2merge_list:
             if (
                 os.path.basename(path).split("-")[0]
                 in glifToRemove
+                or self.keptCodepoints is not None
                 ):
                 print("    INFO:", os.path.basename(path).split("-")[0], "subseted")
                 if os.path.basename(path).split("-")[0] in self.script2warnSubset:
                     print(self.script2warnSubset[os.path.basename(path).split("-")[0]])
-                keep = self.population(path, glifToRemove)
-                font = self.subsetter(ttLib.TTFont(path), keep)
-                font.save(os.path.join(self.destination, os.path.basename(path)))
-                self.actualFonts2merge.append(
-                    os.path.join(self.destination, os.path.basename(path))
-                    )
-                self.subsettedFonts2remove.append(
-                    os.path.join(self.destination, os.path.basename(path))
-                    )
-            else:
-                self.actualFonts2merge.append(path)
+                if self.keptCodepoints is None:
+                    keep = self.population(path, glifToRemove)
+                    subsets.append((path, "Subset", self.subsetterOptions(), keep, ()))
+                else:
+                    # the codepoints of the font that are neither asked
+                    # nor owned by another font are removed; the removals
+                    # come from the first style, another weight can map
+                    # more codepoints
+                    toRemove = set(glifToRemove.get(os.path.basename(path).split("-")[0], ()))
+                    asked = Ownership.fromRanges(self.fontIndex.ranges(path)) & self.keptCodepoints
+                    keep = [u for u in Ownership.toCodepoints(asked) if u not in toRemove]
+                    if self.subset != "":
+                        options = self.customSubsettingOptions()
+                    else:
+                        options = self.subsetterOptions()
+                    subsets.append((path, "Subset", options, [], keep))
+        subsetted = dict(zip(
+            [subset[0] for subset in subsets], self.cachedSubsets(subsets)
+            ))
+        self.actualFonts2merge = [subsetted.get(path, path) for path in self.fonts2merge_list]
 
     def merging(self):
         print("    INFO: starts merging")
-        merger = merge.Merger()
-
-        for ftpath in self.actualFonts2merge:
-            ft, upm = self.upm(ftpath)
-            if upm != 1000:
-                print("Scale", os.path.basename(ftpath), "at 1000 upm")
-                scale_font(ft, 1000 / upm)
-                ft.save(ftpath)
-        self.font = merger.merge(self.actualFonts2merge)
+        # the single merge compiles its output when it is saved, the
+        # merge by groups compiles each group: the saves are measured too
+        with RssMonitor() as rss:
+            if self.memoryBudget is None:
+                merger = CachedMerger(self.fontCache)
+                self.font = merger.merge(self.actualFonts2merge)
+            else:
+                self.font = self.treeMerge(self.actualFonts2merge)
+            self.font = self.normalizeLayout(self.font)
+            outputs = self.saveMerged()
+        if rss.peak is not None:
+            print("    INFO: peak RSS during the merge:", rss.peak >> 20, "MiB (+"
+                + str(rss.growth >> 20), "MiB)"
+                )
+        if self.styleKey is not None:
+            self.mergeCache.put(self.styleKey, outputs)
+        self.fontCache.release()
+        print("    INFO: ends merging\n")
+
+    def saveMerged(self):
         if len(self.metrics) > 0:
             self.font = self.updateMetrics(self.font)
         renamed = self.renamer()
@@ -744,34 +3324,116 @@ class Notobuilder:
             + self.italic.replace("-", "")
             + ".ttf"
         )
+        outputs = []
         if "ttf" in self.output:
-            renamed.save(
-                os.path.join(
-                    self.destination, cleanedNewName.replace("RegularItalic", "Italic")
-                )
-            )
+            outputs.append(os.path.join(
+                self.destination, cleanedNewName.replace("RegularItalic", "Italic")
+                ))
+            renamed.save(outputs[-1])
         if "woff2" in self.output:
             print("    save woff2 fonts")
             renamed.flavor = "woff2"
             woofName = cleanedNewName.replace(".ttf", ".woff2")
-            renamed.save(
-                os.path.join(
-                    self.destination, woofName.replace("RegularItalic", "Italic")
-                )
-            )
-        for suppr in self.subsettedFonts2remove:
-            os.remove(suppr)
-        print("    INFO: ends merging\n")
-        if self.subset != "":
-            customDir = os.path.join(self.scriptsFolder, "Custom_Fonts")
-            for ftpath in os.listdir(customDir):
-                for flavour in [".ttf", ".woff2"]:
-                    if ftpath.endswith(flavour):
-                        kept = str(self.subset)[2:-2]
-                        font = self.customSubsetting(
-                            ttLib.TTFont(os.path.join(customDir, ftpath)), kept
-                        )
-                        font.save(os.path.join(customDir, os.path.basename(ftpath)))
+            outputs.append(os.path.join(
+                self.destination, woofName.replace("RegularItalic", "Italic")
+                ))
+            renamed.save(outputs[-1])
+        return outputs
+
+    # a decompiled font takes about this many times its compiled size
+    decompiledRatio = 30
+
+    def treeMerge(self, ftpaths):
+        """ Merge the fonts in consecutive groups that fit in
+            self.memoryBudget (inputs and output decompiled), then the
+            groups' results the same way, until one font is left. Each
+            intermediate font is compiled and kept in memory until the
+            next level has merged it; the inputs of a group are released
+            as soon as it is merged.
+        """
+        level, depth = list(ftpaths), 0
+        while len(level) > 1:
+            groups, size = [[]], 0
+            for ftpath in level:
+                cost = 2 * self.decompiledRatio * len(self.fontCache.data(ftpath))
+                if len(groups[-1]) > 1 and size + cost > self.memoryBudget:
+                    groups.append([])
+                    size = 0
+                groups[-1].append(ftpath)
+                size += cost
+            if len(groups) == 1:
+                font = CachedMerger(self.fontCache).merge(groups[0])
+                self.releaseMerged(groups[0])
+                return font
+            depth += 1
+            merged = []
+            for i, group in enumerate(groups):
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                print("    INFO: merge", len(group), "fonts at level", depth)
+                merged.append(self.fontCache.keep(
+                    os.path.join("<memory>", "Merged" + str(depth), str(i) + ".ttf"),
+                    CachedMerger(self.fontCache).merge(group)
+                    ))
+                self.releaseMerged(group)
+            level = merged
+        return self.fontCache.copy(level[0], lazy=None)
+
+    def releaseMerged(self, ftpaths):
+        """ Forget the merged fonts kept in memory, and free what is left
+            of their decompiled tables: they reference each other, only
+            a garbage collection frees them.
+        """
+        self.fontCache.release([ftpath for ftpath in ftpaths if ftpath.startswith("<memory>")])
+        gc.collect()
+
+    def normalizeLayout(self, font):
+        """ GSUB and GPOS of the merged font that do not depend on how
+            the fonts were grouped. Merger adds the features it merges at
+            the end of the feature list, and turns lookups into extensions
+            when a table it compiles overflows: the lookups are turned back
+            into plain ones (compiling the font makes the extensions it
+            needs) and the features are sorted by tag and lookups, without
+            duplicates.
+        """
+        for tag, extensionType in [("GSUB", 7), ("GPOS", 9)]:
+            if tag not in font:
+                continue
+            table = font[tag].table
+            if table.LookupList is not None:
+                for lookup in table.LookupList.Lookup:
+                    if lookup.LookupType == extensionType:
+                        lookup.SubTable = [subtable.ExtSubTable for subtable in lookup.SubTable]
+                        lookup.LookupType = lookup.SubTable[0].LookupType
+            if table.FeatureList is None or table.ScriptList is None:
+                continue
+            if getattr(table, "FeatureVariations", None) is not None:
+                # they refer to the features by index too
+                continue
+            keys = []
+            for record in table.FeatureList.FeatureRecord:
+                params = record.Feature.FeatureParams
+                keys.append((
+                    record.FeatureTag, tuple(record.Feature.LookupListIndex),
+                    "" if params is None else repr(sorted(vars(params).items()))
+                    ))
+            records = dict()
+            for key, record in zip(keys, table.FeatureList.FeatureRecord):
+                records.setdefault(key, record)
+            order = sorted(records)
+            index = {key: i for i, key in enumerate(order)}
+            table.FeatureList.FeatureRecord = [records[key] for key in order]
+            table.FeatureList.FeatureCount = len(order)
+            for script in table.ScriptList.ScriptRecord:
+                for langSys in [script.Script.DefaultLangSys] + [r.LangSys for r in script.Script.LangSysRecord]:
+                    if langSys is None:
+                        continue
+                    langSys.FeatureIndex = sorted(set(index[keys[i]] for i in langSys.FeatureIndex))
+                    langSys.FeatureCount = len(langSys.FeatureIndex)
+                    if langSys.ReqFeatureIndex != 0xFFFF:
+                        langSys.ReqFeatureIndex = index[keys[langSys.ReqFeatureIndex]]
+        return font
 
     def updateMetrics(self, ft):
         ascendent = self.metrics[0]
@@ -792,32 +3454,7 @@ class Notobuilder:
         return ft
 
     def uni2glyphname(self, ftpath):
-        f = ttLib.TTFont(ftpath)
-        uni2glyphname = dict()
-        cmap = f["cmap"].tables
-        for table in cmap:
-            if table.platformID == 3:
-                for uni, name in table.cmap.items():
-                    if uni not in uni2glyphname:
-                        uni2glyphname[uni] = name
-        return uni2glyphname
-
-    def getIdentic(self, mydict):
-        values = list(mydict.values())
-        identic = copy.deepcopy(set(values[0]))
-        identic2add = []
-        allDuplicates = []
-        identicAlreadyDone = []
-        for x in values[1:]:
-            identic = identic & set(x)
-        allDuplicates = [ad for ad in identic]
-        for i in identic:
-            if i not in self.uniGlyphsAlreadySorted:
-                self.uniGlyphsAlreadySorted.append(i)
-                identic2add.append(i)
-            else:
-                identicAlreadyDone.append(i)
-        return identicAlreadyDone, identic2add
+        return self.fontIndex.cmap(ftpath)
 
     def duplicate(self, head, tail):
         self.toKeep = {**self.uni2glyphname(head), **self.toKeep}
@@ -827,7 +3464,7 @@ class Notobuilder:
         for i in duplicate:
             remove.append(self.toSubset[i])
         populate = []
-        for i in ttLib.TTFont(tail).getGlyphOrder():
+        for i in self.fontIndex.glyphOrder(tail):
             if i not in remove:
                 populate.append(i)
         return populate
@@ -835,7 +3472,7 @@ class Notobuilder:
     def glyphOrders(self, fontpathlist):
         ftpath2glyphorder = dict()
         for fpath in fontpathlist:
-            ftpath2glyphorder[fpath] = ttLib.TTFont(fpath).getGlyphOrder()
+            ftpath2glyphorder[fpath] = self.fontIndex.glyphOrder(fpath)
         return ftpath2glyphorder
 
     def getChrs(self, duplicate):
@@ -847,11 +3484,57 @@ class Notobuilder:
         return s
 
     def upm(self, ftpath):
-        ft = ttLib.TTFont(ftpath)
-        upm = ft["head"].unitsPerEm
-        return ft, upm
+        return self.fontIndex.upm(ftpath)
+
+    def cachedSubsets(self, subsets):
+        """ For each (ftpath, stage, options, glyphs, unicodes), keep only
+            these glyphs and codepoints in the font, or take the result of
+            the same subsetting from the subset cache, and keep it in
+            memory for the next stages.
+            The subsettings that are not cached are spread over the
+            subset pool. Returns the names of the new fonts, in the order
+            of subsets.
+        """
+        keys = [
+            SubsetCache.key(self.fontIndex.sha(ftpath), glyphs, options, unicodes)
+            for ftpath, stage, options, glyphs, unicodes in subsets
+            ]
+        results = [self.subsetCache.get(key) for key in keys]
+        misses = [i for i in range(len(subsets)) if results[i] is None]
+        if len(misses) > 1 and self.jobs > 1:
+            pool = self.subsetterPool()
+            futures = [
+                pool.submit(subsetFont, self.fontCache.data(subsets[i][0]), *subsets[i][2:])
+                for i in misses
+                ]
+            for i, future in zip(misses, futures):
+                results[i] = future.result()
+        else:
+            for i in misses:
+                results[i] = subsetFont(self.fontCache.data(subsets[i][0]), *subsets[i][2:])
+        for i in misses:
+            self.subsetCache.put(keys[i], results[i])
+        names = []
+        for (ftpath, stage, options, glyphs, unicodes), data in zip(subsets, results):
+            names.append(self.fontCache.keepData(
+                os.path.join("<memory>", stage, os.path.basename(ftpath)), data
+                ))
+        return names
+
+    def subsetterPool(self):
+        """ A pool of at most self.jobs processes, started by the first
+            stage that needs it and shared by the next ones.
+        """
+        if self.subsetPool is None:
+            self.subsetPool = ProcessPoolExecutor(max_workers=self.jobs)
+        return self.subsetPool
+
+    def closeSubsetPool(self):
+        if self.subsetPool is not None:
+            self.subsetPool.shutdown()
+            self.subsetPool = None
 
-    def subsetter(self, font, subset):
+    def subsetterOptions(self):
         """ use the noto fonts glyphsnames
             to subset fonts with premade subsettings
         """
@@ -867,13 +3550,9 @@ class Notobuilder:
         options.ignore_missing_glyphs = True
         options.prune_unicode_ranges = True
         options.recommended_glyphs = True
-        subsetter = Subsetter(options=options)
-        subsetter.populate(glyphs=subset)
-        subsetter.subset(font)
-
-        return font
+        return options
 
-    def customSubsetting(self, font, text):
+    def customSubsettingOptions(self):
         options = Options()
         options.layout_features = "*"  # keep all GSUB/GPOS features
         options.glyph_names = False  # keep post glyph names
@@ -885,13 +3564,9 @@ class Notobuilder:
         options.ignore_missing_glyphs = False
         options.recommended_glyphs = True
         options.prune_unicode_ranges = True
-        subsetter = Subsetter(options=options)
-        subsetter.populate(text=text, unicodes=[0, 13, 32])
-        subsetter.subset(font)
+        return options
 
-        return font
-
-    def arabicSubsetter(self, font, subset):
+    def arabicSubsetterOptions(self):
         options = Options()
         options.layout_features = "*"  # keep all GSUB/GPOS features
         options.no_layout_closure = True
@@ -904,11 +3579,7 @@ class Notobuilder:
         options.ignore_missing_glyphs = False
         options.recommended_glyphs = True
         options.prune_unicode_ranges = True
-        subsetter = Subsetter(options=options)
-        subsetter.populate(glyphs=subset)
-        subsetter.subset(font)
-
-        return font
+        return options
 
     def swaper(self):
         ftpathList, swaped, unicodesInt = [], [], []
@@ -1002,7 +3673,7 @@ class Notobuilder:
                 unicodesInt = unicodesInt + unicodeIJ
 
         for path in ftpathList:
-            ft = ttLib.TTFont(path)
+            ft = self.fontCache.copy(path)
             cmap = ft['cmap']
             go = ft.getGlyphOrder()
             outtables = []
@@ -1022,10 +3693,17 @@ class Notobuilder:
 
                 cmap.tables = []
                 cmap.tables = outtables
-                newpath = path.replace(".ttf", "_edited.ttf")
 
-                ft.save(newpath)
-                self.fonts2merge_list = self.listReplacer(path, newpath, self.fonts2merge_list)
+            newpath = self.inMemory(ft, "Swaped", path.replace(".ttf", "_edited.ttf"))
+            self.fonts2merge_list = self.listReplacer(path, newpath, self.fonts2merge_list)
+
+    def inMemory(self, font, stage, ftpath):
+        """ Hand the font of a stage over to the next ones without
+            writing it: the returned name is used in place of its path.
+        """
+        return self.fontCache.keep(
+            os.path.join("<memory>", stage, os.path.basename(ftpath)), font
+            )
 
     def listReplacer(self, old, new, list_):
         edited = copy.deepcopy(list_)
@@ -1133,7 +3811,8 @@ def main():
         "-o", "--output", help="Generate the Custom Fonts as ttf or woff2.", nargs="*")
     parser.add_argument(
         "--contrast",
-        help="Output the Custom Font in a contrasted or no contrasted style.", nargs=1,)
+        help="Output the Custom Font in a contrasted or no contrasted style." +
+        " Several contrasts can be given to --prefetch.", nargs="+",)
     parser.add_argument(
         "--styles", help="Italic, Display or Monospaced style for Latin, Greek, Cyrillic." +
         " Kufi or Nastaliq for Arabic. Italic for Tamil.", nargs="*")
@@ -1148,10 +3827,36 @@ def main():
         " Tighter vertical metrics and mark positioning.", action="store_true")
     parser.add_argument("--metrics", nargs=2, help="Modify the vertical metrics.")
     parser.add_argument("--subset", nargs=1)
+    parser.add_argument("--unicodes", nargs="+", help="Keep only these codepoints: presets, Unicode" +
+                        " blocks and U+XXXX-YYYY ranges joined by + (union), & (intersection) or - (difference).")
     parser.add_argument("--compatibility", action="store_true")
     parser.add_argument("--version", nargs=1, help="Change the version number.")
+    parser.add_argument("--jobs", nargs=1, help="Number of parallel downloads and subsetting processes. Default is 8")
+    parser.add_argument("--source", nargs=1, help="Where to take the fonts from: github (default)," +
+        " mirror:<folder of notofonts checkouts>, archive:<zip or tar file>, or the URL of a --serve server.")
+    parser.add_argument("--serve", nargs=1, help="Serve a folder of notofonts checkouts as a GitHub stand-in.")
+    parser.add_argument("--port", nargs=1, help="Port of the --serve server. Default is 8000")
+    parser.add_argument("--prefetch", nargs="?", const="asked", help="Only download the fonts needed by" +
+        " the asked scripts, contrasts, styles, weights and widths ('--prefetch all' for all the Noto" +
+        " repositories) and write NotoFonts/manifest.json.")
+    parser.add_argument("--verify", action="store_true", help="Check NotoFonts against its manifest.")
+    parser.add_argument("--coverage", action="store_true", help="Print the font that supplies each Unicode block.")
+    parser.add_argument("--no-cache", action="store_true", help="Merge the fonts again instead of taking them from the merge cache.")
+    parser.add_argument("--memory-budget", nargs=1, help="Merge the fonts by groups that fit in this many MiB.")
     args = parser.parse_args()
 
+    if "--serve" in sys.argv:
+        port = 8000
+        if "--port" in sys.argv:
+            port = int(args.port[0])
+        notoFontsFolder = os.path.join(os.path.split(sys.argv[0])[0], "NotoFonts")
+        server = MirrorServer(args.serve[0], notoFontsFolder, port)
+        try:
+            server.serve()
+        except KeyboardInterrupt:
+            server.shutdown()
+        return
+
     version = "1.000"
     newName = ["MyNoto"]
     subset = ""
@@ -1165,6 +3870,10 @@ def main():
     ui = False
     metrics = []
     compatibility = False
+    jobs = 8
+    source = "github"
+    unicodes = None
+    memoryBudget = None
 
     if "--output" in sys.argv or "-o" in sys.argv:
         output = args.output
@@ -1192,24 +3901,66 @@ def main():
         subset = args.subset
     if "--version" in sys.argv:
         version = args.version
-
-    build = Notobuilder(
-        newName,  # optional
-        output,  # only ttf (and therefor woff2) for now
-        args.scripts,  # list of writing systems
-        args.contrast,  # sans or serif
-        styles,  # italic, kufi, display, etc…
-        preset,  # pre made subset
-        swapedstyles,  # swap the IJ shapes, use [tabular] old style/lining figures as default
-        weight,  # list of weight. Set as Regular if not specified
-        width,  # list of width. Set as Normal if not specified
-        hinted,  # take unhinted fonts as default.
-        ui, #use the UI version if it exists
-        metrics, #modify the vertical metrics
-        compatibility, #choose only common width / weights
-        subset, # keep only the asked glyphs
-        version # change the version number
-    )
+    if "--jobs" in sys.argv:
+        jobs = int(args.jobs[0])
+    if "--source" in sys.argv:
+        source = args.source[0]
+    if "--unicodes" in sys.argv:
+        unicodes = UnicodeRanges.parse(args.unicodes)
+    if "--memory-budget" in sys.argv:
+        memoryBudget = int(args.memory_budget[0]) << 20
+
+    scriptsFolder = os.path.split(sys.argv[0])[0]
+    notoFontsFolder = os.path.join(scriptsFolder, "NotoFonts")
+    if args.verify:
+        problems = Manifest(notoFontsFolder).verify(jobs)
+        for relpath, status in problems:
+            print("ERROR:", relpath, {"missing": "is missing",
+                "size": "has a wrong size", "sha": "has a wrong content"}[status])
+        return int(len(problems) > 0)
+    if args.prefetch == "all":
+        if not os.path.exists(notoFontsFolder):
+            os.makedirs(notoFontsFolder)
+        fontSource = FontSource.fromSpec(source, notoFontsFolder, jobs)
+        dl = Download(fontSource.repositories(), scriptsFolder, hinted, jobs, fontSource)
+        dl.dwnldFonts()
+        manifest = Manifest(notoFontsFolder)
+        manifest.update(dl.manifestEntries())
+        manifest.save()
+        return
+
+    contrasts = args.contrast
+    if args.prefetch is None and len(contrasts) > 1:
+        parser.error("several --contrast values can only be given to --prefetch")
+    for contrast in contrasts:
+        try:
+            build = Notobuilder(
+                newName,  # optional
+                output,  # only ttf (and therefor woff2) for now
+                args.scripts,  # list of writing systems
+                [contrast],  # sans or serif
+                styles,  # italic, kufi, display, etc…
+                preset,  # pre made subset
+                swapedstyles,  # swap the IJ shapes, use [tabular] old style/lining figures as default
+                weight,  # list of weight. Set as Regular if not specified
+                width,  # list of width. Set as Normal if not specified
+                hinted,  # take unhinted fonts as default.
+                ui, #use the UI version if it exists
+                metrics, #modify the vertical metrics
+                compatibility, #choose only common width / weights
+                subset, # keep only the asked glyphs
+                version, # change the version number
+                jobs, # number of parallel downloads
+                source, # github, local mirror, archive or stand-in server
+                args.prefetch is not None, # only download the fonts
+                args.coverage, # print which font supplies each Unicode block
+                unicodes, # keep only these codepoints
+                not args.no_cache, # take the merged fonts of the previous builds
+                memoryBudget # merge by groups that fit in this memory
+            )
+        except GlyphLimitError as e:
+            print("ERROR:", e)
+            return 1
 
 if __name__ == "__main__":
     sys.exit(main())
\ No newline at end of file
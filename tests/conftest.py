@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+from fontTools.fontBuilder import FontBuilder
+from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+# notobuilderCLI.py is a script at the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def buildFont(path, cmap, upm=1000):
+    """ A TrueType font with an empty glyph for each name of cmap
+        ({codepoint: glyph name}).
+    """
+    glyphOrder = [".notdef"] + sorted(set(cmap.values()))
+    glyph = TTGlyphPen(None).glyph()
+    fb = FontBuilder(upm, isTTF=True)
+    fb.setupGlyphOrder(glyphOrder)
+    fb.setupCharacterMap(cmap)
+    fb.setupGlyf({name: glyph for name in glyphOrder})
+    fb.setupHorizontalMetrics({name: (upm // 2, 0) for name in glyphOrder})
+    fb.setupHorizontalHeader(ascent=upm * 8 // 10, descent=-upm // 5)
+    fb.setupNameTable({"familyName": "Test", "styleName": "Regular"})
+    fb.setupOS2()
+    fb.setupPost()
+    fb.save(path)
+    return path
+
+
+@pytest.fixture
+def makeFont(tmp_path):
+    def make(name, cmap, upm=1000):
+        return buildFont(str(tmp_path / name), cmap, upm)
+    return make
@@ -0,0 +1,87 @@
+import os
+
+import pytest
+
+from notobuilderCLI import BlobStore
+
+data = bytes(range(256)) * 1000
+
+
+def chunks(data, size=4096):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+def test_hash():
+    # the git blob hash, as given by the GitHub APIs
+    assert BlobStore.hashBytes(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+def test_write(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    sha = BlobStore.hashBytes(data)
+    path = blobs.write(sha, len(data), chunks(data))
+    assert blobs.has(sha)
+    with open(path, "rb") as f:
+        assert f.read() == data
+    assert BlobStore.hashFile(path) == sha
+
+
+def test_corrupted(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    sha = BlobStore.hashBytes(data)
+    corrupted = data[:1000] + b"\0" + data[1001:]
+    with pytest.raises(ValueError):
+        blobs.write(sha, len(data), chunks(corrupted))
+    assert not blobs.has(sha)
+    assert blobs.partSize(sha) == 0
+
+
+def test_resume(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    sha = BlobStore.hashBytes(data)
+    # a download interrupted after 10000 bytes
+    os.makedirs(os.path.dirname(blobs.partPath(sha)))
+    with open(blobs.partPath(sha), "wb") as f:
+        f.write(data[:10000])
+    offset = blobs.partSize(sha)
+    assert offset == 10000
+    path = blobs.write(sha, len(data), chunks(data[offset:]), offset)
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_resumeCorrupted(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    sha = BlobStore.hashBytes(data)
+    os.makedirs(os.path.dirname(blobs.partPath(sha)))
+    with open(blobs.partPath(sha), "wb") as f:
+        f.write(b"\0" * 10000)
+    with pytest.raises(ValueError):
+        blobs.write(sha, len(data), chunks(data[10000:]), 10000)
+    assert not blobs.has(sha)
+    # the next attempt starts from scratch
+    assert blobs.partSize(sha) == 0
+
+
+def test_adopt(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    src = tmp_path / "mirror.ttf"
+    src.write_bytes(data)
+    sha = BlobStore.hashBytes(data)
+    path = blobs.adopt(sha, str(src))
+    # a copy: editing the mirror does not change the blob
+    assert not os.path.samefile(path, str(src))
+    src.write_bytes(b"edited")
+    assert BlobStore.hashFile(path) == sha
+    with pytest.raises(ValueError):
+        blobs.adopt(BlobStore.hashBytes(data + b"!"), str(src))
+
+
+def test_link(tmp_path):
+    blobs = BlobStore(str(tmp_path / "blobs"))
+    sha = BlobStore.hashBytes(data)
+    blobs.write(sha, len(data), chunks(data))
+    dest = str(tmp_path / "NotoSans-Regular.ttf")
+    blobs.link(sha, dest)
+    assert BlobStore.hashFile(dest) == sha
+    assert blobs.link(sha, dest) == dest
@@ -0,0 +1,90 @@
+import os
+import subprocess
+import sys
+
+from fontTools import subset
+
+import notobuilderCLI
+from notobuilderCLI import MergeCache, SubsetCache
+
+keyScript = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from fontTools import subset
+from notobuilderCLI import MergeCache, SubsetCache
+print(SubsetCache.key("0" * 40, {"A", "B", "space", "Aogonek"}, subset.Options(), {0x41, 0x42}))
+print(MergeCache.key(["builder", {"b": [1, 2], "a": None}, ["Latin", "Arabic"]]))
+"""
+
+
+def test_subsetKey():
+    options = subset.Options()
+    key = SubsetCache.key("0" * 40, ["B", "A", "B"], options)
+    assert key == SubsetCache.key("0" * 40, {"A", "B"}, subset.Options())
+    assert key != SubsetCache.key("1" * 40, ["A", "B"], options)
+    assert key != SubsetCache.key("0" * 40, ["A"], options)
+    options.layout_features = ["*"]
+    assert key != SubsetCache.key("0" * 40, ["A", "B"], options)
+
+
+def test_subsetKeyUnicodes():
+    options = subset.Options()
+    key = SubsetCache.key("0" * 40, ["A"], options, [0x42, 0x41, 0x41])
+    assert key == SubsetCache.key("0" * 40, ["A"], options, {0x41, 0x42})
+    assert key != SubsetCache.key("0" * 40, ["A"], options)
+    assert key != SubsetCache.key("0" * 40, ["A"], options, {0x41})
+
+
+def test_mergeKey():
+    key = MergeCache.key(["builder", {"a": None, "b": [1, 2]}])
+    assert key == MergeCache.key(["builder", {"b": [1, 2], "a": None}])
+    assert key != MergeCache.key(["builder", {"a": None, "b": [2, 1]}])
+
+
+def test_keysAcrossRuns():
+    # no dependency on the hash seed of the interpreter: the keys of
+    # another run find the same cache entries
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = set()
+    for seed in ["1", "2"]:
+        outputs.add(subprocess.check_output(
+            [sys.executable, "-c", keyScript, root],
+            env=dict(os.environ, PYTHONHASHSEED=seed), cwd=root,
+            ))
+    assert len(outputs) == 1
+
+
+def test_subsetCache(tmp_path):
+    cache = SubsetCache(str(tmp_path), maxBytes=150)
+    assert cache.get("a") is None
+    cache.put("a", b"a" * 100)
+    assert cache.get("a") == b"a" * 100
+    os.utime(cache.path("a"), (0, 0))
+    cache.put("b", b"b" * 100)
+    # over maxBytes: the least recently used entry is removed
+    assert cache.get("a") is None
+    assert cache.get("b") == b"b" * 100
+    assert (cache.hits, cache.misses) == (2, 2)
+
+
+def test_mergeCache(tmp_path):
+    cache = MergeCache(str(tmp_path / "NotoFonts"))
+    output = tmp_path / "MyNoto-Regular.ttf"
+    output.write_bytes(b"font")
+    destination = tmp_path / "Custom_Fonts"
+    destination.mkdir()
+    assert cache.get("key", str(destination)) is None
+    cache.put("key", [str(output)])
+    assert cache.get("key", str(destination)) == ["MyNoto-Regular.ttf"]
+    assert (destination / "MyNoto-Regular.ttf").read_bytes() == b"font"
+
+
+def test_builderSha(monkeypatch):
+    sha = notobuilderCLI.builderSha()
+
+    def notRead(*args):
+        raise AssertionError("the builder is read again")
+
+    # read once per process, not once per style
+    monkeypatch.setattr(notobuilderCLI, "open", notRead, raising=False)
+    assert notobuilderCLI.builderSha() == sha
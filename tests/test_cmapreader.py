@@ -0,0 +1,93 @@
+import random
+import struct
+
+import pytest
+from fontTools import ttLib
+
+from notobuilderCLI import CmapReader, sfntGlyphCount
+
+
+def sampleCmap():
+    """ Runs of consecutive glyphs (idDelta segments), shuffled glyphs
+        (idRangeOffset segments) and supplementary codepoints (format 12).
+    """
+    cmap = {u: "run%04X" % u for u in range(0x41, 0x5B)}
+    shuffled = list(range(0x400, 0x460))
+    random.Random(0).shuffle(shuffled)
+    cmap.update({u: "glyph%04X" % g for u, g in zip(range(0x400, 0x460), shuffled)})
+    cmap.update({u: "supp%05X" % u for u in range(0x1F600, 0x1F620)})
+    cmap[0xFFFD] = "glyph0400"
+    return cmap
+
+
+def subtables(ftpath):
+    """ {(platformID, encodingID): (format, offset of the subtable)}.
+    """
+    with open(ftpath, "rb") as f:
+        data = f.read()
+    cmapOffset = CmapReader(ftpath).tableDirectory(data)[b"cmap"][0]
+    numTables = struct.unpack_from(">H", data, cmapOffset + 2)[0]
+    found = dict()
+    for i in range(numTables):
+        platformID, encodingID, offset = struct.unpack_from(">HHL", data, cmapOffset + 4 + 8 * i)
+        format = struct.unpack_from(">H", data, cmapOffset + offset)[0]
+        found[(platformID, encodingID)] = (format, cmapOffset + offset)
+    return data, found
+
+
+def fontToolsMapping(ftpath, platformID, encodingID):
+    font = ttLib.TTFont(ftpath)
+    subtable = font["cmap"].getcmap(platformID, encodingID)
+    return {u: font.getGlyphID(name) for u, name in subtable.cmap.items()}
+
+
+def test_format4(makeFont):
+    ftpath = makeFont("cmap.ttf", sampleCmap())
+    data, found = subtables(ftpath)
+    format, offset = found[(3, 1)]
+    assert format == 4
+    assert CmapReader.format4(data, offset) == fontToolsMapping(ftpath, 3, 1)
+
+
+def test_format12(makeFont):
+    ftpath = makeFont("cmap.ttf", sampleCmap())
+    data, found = subtables(ftpath)
+    format, offset = found[(3, 10)]
+    assert format == 12
+    assert CmapReader.format12(data, offset) == fontToolsMapping(ftpath, 3, 10)
+
+
+def test_read(makeFont):
+    ftpath = makeFont("cmap.ttf", sampleCmap())
+    font = ttLib.TTFont(ftpath)
+    expected = {u: font.getGlyphID(name) for u, name in font.getBestCmap().items()}
+    assert CmapReader(ftpath).read() == expected
+    with open(ftpath, "rb") as f:
+        assert CmapReader(ftpath, f.read()).read() == expected
+    codepoints, gids = CmapReader(ftpath).mapping()
+    assert list(codepoints) == sorted(expected)
+    assert list(gids) == [expected[u] for u in sorted(expected)]
+
+
+def test_toRanges():
+    assert CmapReader.toRanges([0x41, 0x42, 0x43, 0x61, 0x1F600]) == [
+        (0x41, 0x43), (0x61, 0x61), (0x1F600, 0x1F600)
+        ]
+    assert CmapReader.toRanges([]) == []
+
+
+def test_notAFont(tmp_path):
+    ftpath = tmp_path / "font.ttf"
+    ftpath.write_bytes(b"not a font at all")
+    with pytest.raises(ValueError):
+        CmapReader(str(ftpath)).read()
+
+
+def test_glyphCount(makeFont):
+    ftpath = makeFont("cmap.ttf", sampleCmap())
+    with open(ftpath, "rb") as f:
+        data = f.read()
+    count = sfntGlyphCount(lambda offset, length: data[offset:offset + length])
+    assert count == ttLib.TTFont(ftpath)["maxp"].numGlyphs
+    with pytest.raises(ValueError):
+        sfntGlyphCount(lambda offset, length: data[:40][offset:offset + length])
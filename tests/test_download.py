@@ -0,0 +1,151 @@
+import os
+import time
+
+import pytest
+
+from conftest import buildFont
+from notobuilderCLI import BlobStore, Download, FontSource
+
+
+class FakeSource(FontSource):
+    """ Fonts served from memory. A fetch waits delays[name] seconds or
+        fails if the name is in failures.
+    """
+
+    def __init__(self, repos, delays=None, failures=()):
+        super().__init__()
+        self.repos = repos
+        self.delays = delays or dict()
+        self.failures = set(failures)
+        self.fetched = []
+
+    def listing(self, repoName, fontsPath):
+        if repoName not in self.repos:
+            return None
+        files = [
+            (name, BlobStore.hashBytes(data), len(data), (repoName, name))
+            for name, data in sorted(self.repos[repoName].items())
+            ]
+        return {"sha": self.treeSha(files), "files": files}
+
+    def fetch(self, locator, sha, size, blobs):
+        repoName, name = locator
+        time.sleep(self.delays.get(name, 0))
+        if name in self.failures:
+            raise OSError("connection reset")
+        path = blobs.write(sha, size, [self.repos[repoName][name]])
+        with self.lock:
+            self.fetched.append(name)
+        self.count(files=1, size=size)
+        return path
+
+    def glyphCount(self, locator, sha, size):
+        return 0
+
+    def repositories(self):
+        return sorted(self.repos)
+
+
+@pytest.fixture(scope="module")
+def repos(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("fonts")
+    repos = dict()
+    for repoName, first in [("NotoSans", 0x41), ("NotoSansTamil", 0xB85)]:
+        repos[repoName] = dict()
+        for i, style in enumerate(["Regular", "Bold", "Black", "Thin"]):
+            name = repoName + "-" + style + ".ttf"
+            path = buildFont(str(folder / name), {first + i: "g" + str(i)})
+            with open(path, "rb") as f:
+                repos[repoName][name] = f.read()
+    return repos
+
+
+def everything(repos):
+    return {repoName: [[name] for name in sorted(fonts)] for repoName, fonts in repos.items()}
+
+
+def diskState(scriptsFolder):
+    """ {path relative to NotoFonts: content} of the fonts. """
+    notoFontsFolder = os.path.join(str(scriptsFolder), "NotoFonts")
+    state = dict()
+    for repoName in sorted(os.listdir(notoFontsFolder)):
+        folder = os.path.join(notoFontsFolder, repoName, "instance_ttf")
+        if os.path.isdir(folder):
+            for name in os.listdir(folder):
+                with open(os.path.join(folder, name), "rb") as f:
+                    state[repoName + "/" + name] = f.read()
+    return state
+
+
+def test_outOfOrder(repos, tmp_path):
+    names = [name for repoName in sorted(repos) for name in sorted(repos[repoName])]
+    # the first submitted fetches end last
+    delays = {name: 0.05 * (len(names) - i) for i, name in enumerate(names)}
+    source = FakeSource(repos, delays)
+    dl = Download(sorted(repos), str(tmp_path / "parallel"), jobs=8, source=source)
+    dl.dwnldFonts(everything(repos))
+    assert source.fetched != names
+    assert sorted(source.fetched) == sorted(names)
+
+    serial = FakeSource(repos)
+    Download(sorted(repos), str(tmp_path / "serial"), jobs=1, source=serial).dwnldFonts(everything(repos))
+    state = diskState(tmp_path / "parallel")
+    assert state == diskState(tmp_path / "serial")
+    assert state == {
+        repoName + "/" + name: data
+        for repoName in repos for name, data in repos[repoName].items()
+        }
+
+
+def test_failedFetch(repos, tmp_path):
+    source = FakeSource(repos, failures=["NotoSans-Bold.ttf", "NotoSansTamil-Bold.ttf",
+        "NotoSansTamil-Black.ttf"])
+    dl = Download(sorted(repos), str(tmp_path), jobs=4, source=source)
+    dl.dwnldFonts({
+        # the next candidate is tried when a fetch fails
+        "NotoSans": [["NotoSans-Bold.ttf", "NotoSans-Black.ttf"], ["NotoSans-Regular.ttf"]],
+        "NotoSansTamil": [["NotoSansTamil-Bold.ttf", "NotoSansTamil-Black.ttf"]],
+        })
+    assert sorted(diskState(tmp_path)) == ["NotoSans/NotoSans-Black.ttf", "NotoSans/NotoSans-Regular.ttf"]
+    blobs = BlobStore(str(tmp_path / "NotoFonts" / "blobs"))
+    for name in ["NotoSans-Bold.ttf", "NotoSansTamil-Bold.ttf", "NotoSansTamil-Black.ttf"]:
+        repoName = name.split("-")[0]
+        sha = BlobStore.hashBytes(repos[repoName][name])
+        assert not blobs.has(sha)
+        assert blobs.partSize(sha) == 0
+
+
+def test_diskState(repos, tmp_path):
+    source = FakeSource(repos)
+    stale = tmp_path / "NotoFonts" / "NotoSans" / "instance_ttf" / "NotoSans-Removed.ttf"
+    stale.parent.mkdir(parents=True)
+    stale.write_bytes(b"")
+    dl = Download(sorted(repos), str(tmp_path), jobs=4, source=source)
+    dl.dwnldFonts({"NotoSans": [["NotoSans-Regular.ttf"], ["NotoSans-Bold.ttf"]]})
+    # the fonts no longer listed are removed, the others are blobs
+    assert sorted(diskState(tmp_path)) == ["NotoSans/NotoSans-Bold.ttf", "NotoSans/NotoSans-Regular.ttf"]
+    blobs = BlobStore(str(tmp_path / "NotoFonts" / "blobs"))
+    for name in ["NotoSans-Regular.ttf", "NotoSans-Bold.ttf"]:
+        path = str(tmp_path / "NotoFonts" / "NotoSans" / "instance_ttf" / name)
+        assert BlobStore.hashFile(path) == BlobStore.hashBytes(repos["NotoSans"][name])
+        assert blobs.has(BlobStore.hashBytes(repos["NotoSans"][name]))
+
+    # up to date: nothing is fetched again
+    again = FakeSource(repos)
+    Download(sorted(repos), str(tmp_path), jobs=4, source=again).dwnldFonts(
+        {"NotoSans": [["NotoSans-Regular.ttf"], ["NotoSans-Bold.ttf"]]}
+        )
+    assert again.fetched == []
+
+
+def test_sharedBlob(repos, tmp_path):
+    shared = dict(repos)
+    shared["NotoSansCopy"] = {"NotoSansCopy-Regular.ttf": repos["NotoSans"]["NotoSans-Regular.ttf"]}
+    source = FakeSource(shared)
+    Download(["NotoSans", "NotoSansCopy"], str(tmp_path), jobs=4, source=source).dwnldFonts({
+        "NotoSans": [["NotoSans-Regular.ttf"]],
+        "NotoSansCopy": [["NotoSansCopy-Regular.ttf"]],
+        })
+    # fetched once, linked in both repositories
+    assert len(source.fetched) == 1
+    assert sorted(diskState(tmp_path)) == ["NotoSans/NotoSans-Regular.ttf", "NotoSansCopy/NotoSansCopy-Regular.ttf"]
@@ -0,0 +1,63 @@
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from conftest import buildFont
+from notobuilderCLI import BlobStore, Download, FontIndex
+
+fontsPath = os.path.join("fonts", "ttf", "unhinted", "instance_ttf")
+
+
+@pytest.fixture(scope="module")
+def mirror(tmp_path_factory):
+    """ A folder of checkouts, and the same as a zip and a tar.gz of
+        GitHub archives (<repo>-main folders).
+    """
+    root = tmp_path_factory.mktemp("sources")
+    folder = root / "mirror"
+    for repoName, first in [("NotoSans", 0x41), ("NotoSansTamil", 0xB85)]:
+        fonts = folder / repoName / fontsPath
+        fonts.mkdir(parents=True)
+        for i, style in enumerate(["Regular", "Bold"]):
+            buildFont(str(fonts / (repoName + "-" + style + ".ttf")), {first + i: "g" + str(i)})
+    paths = [
+        os.path.join(dirpath, name)
+        for dirpath, dirnames, names in os.walk(str(folder)) for name in names
+        ]
+    with zipfile.ZipFile(str(root / "mirror.zip"), "w") as archive:
+        for path in paths:
+            relpath = os.path.relpath(path, str(folder)).split(os.sep)
+            archive.write(path, "/".join([relpath[0] + "-main"] + relpath[1:]))
+    with tarfile.open(str(root / "mirror.tar.gz"), "w:gz") as archive:
+        for path in paths:
+            relpath = os.path.relpath(path, str(folder)).split(os.sep)
+            archive.add(path, "/".join([relpath[0] + "-main"] + relpath[1:]))
+    return root
+
+
+@pytest.mark.parametrize("spec", ["mirror:mirror", "archive:mirror.zip", "archive:mirror.tar.gz"])
+def test_indexed(mirror, tmp_path, spec, monkeypatch):
+    kind, name = spec.split(":")
+    dl = Download(["NotoSans", "NotoSansTamil"], str(tmp_path), jobs=4,
+        source=kind + ":" + str(mirror / name))
+    dl.dwnldFonts()
+    dl.close()
+    paths = []
+    for repoName in ["NotoSans", "NotoSansTamil"]:
+        for style in ["Regular", "Bold"]:
+            ftname = repoName + "-" + style + ".ttf"
+            path = str(tmp_path / "NotoFonts" / repoName / "instance_ttf" / ftname)
+            assert BlobStore.hashFile(path) == BlobStore.hashFile(str(mirror / "mirror" / repoName / fontsPath / ftname))
+            paths.append(path)
+
+    # the next run reads them from the index, without parsing them
+    def build(self, sha, ftpath):
+        raise AssertionError(ftpath + " is parsed again")
+
+    monkeypatch.setattr(FontIndex, "build", build)
+    fontIndex = FontIndex(str(tmp_path / "NotoFonts"))
+    for path in paths:
+        assert fontIndex.glyphCount(path) == 2
+    fontIndex.close()
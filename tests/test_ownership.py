@@ -0,0 +1,69 @@
+import os
+
+from notobuilderCLI import BlobStore, CmapReader, Ownership
+
+
+def baselineDuplicates(cmaps):
+    """ The duplicates of the baseline Notobuilder.duplicate: the
+        codepoints of a font already mapped by one of the fonts before it.
+    """
+    toKeep = set()
+    duplicates = []
+    for cmap in cmaps:
+        duplicates.append(set(cmap) & toKeep)
+        toKeep |= set(cmap)
+    return duplicates
+
+
+def sampleFonts(makeFont):
+    cmaps = [
+        {u: "a%04X" % u for u in list(range(0x20, 0x80)) + list(range(0x400, 0x420))},
+        {u: "b%04X" % u for u in list(range(0x41, 0x5B)) + list(range(0x600, 0x700))},
+        {u: "c%04X" % u for u in list(range(0x30, 0x3A)) + list(range(0x680, 0x6A0)) + [0x1F600]},
+        ]
+    paths = [makeFont("font" + str(i) + ".ttf", cmap) for i, cmap in enumerate(cmaps)]
+    fonts = [
+        (os.path.basename(p), BlobStore.hashFile(p), CmapReader(p).ranges()) for p in paths
+        ]
+    return cmaps, fonts
+
+
+def test_duplicates(makeFont):
+    cmaps, fonts = sampleFonts(makeFont)
+    ownership = Ownership(fonts)
+    for i, duplicates in enumerate(baselineDuplicates(cmaps)):
+        assert set(Ownership.toCodepoints(ownership.removed(i))) == duplicates
+        owned = set(Ownership.toCodepoints(ownership.owned[i]))
+        assert owned == set(cmaps[i]) - duplicates
+
+
+def test_saveLoad(makeFont, tmp_path):
+    cmaps, fonts = sampleFonts(makeFont)
+    ownership = Ownership(fonts)
+    path = str(tmp_path / "ownership" / (Ownership.key(ownership.shas) + ".json"))
+    ownership.save(path)
+    loaded = Ownership.load(path)
+    assert loaded.names == ownership.names
+    assert loaded.shas == ownership.shas
+    assert loaded.masks == ownership.masks
+    assert loaded.owned == ownership.owned
+
+
+def test_evict(makeFont, tmp_path, monkeypatch):
+    cmaps, fonts = sampleFonts(makeFont)
+    folder = tmp_path / "ownership"
+    first = Ownership(fonts)
+    first.save(str(folder / "first.json"))
+    os.utime(str(folder / "first.json"), (0, 0))
+    monkeypatch.setattr(Ownership, "maxBytes", os.path.getsize(str(folder / "first.json")))
+    Ownership(fonts[1:]).save(str(folder / "second.json"))
+    # the least recently used one goes first
+    assert sorted(os.listdir(str(folder))) == ["second.json"]
+
+
+def test_ranges():
+    ranges = [(0x41, 0x43), (0x61, 0x61), (0x1F600, 0x1F601)]
+    assert Ownership.toRanges(Ownership.fromRanges(ranges)) == ranges
+    # overlapping and unsorted ranges are merged
+    assert Ownership.toRanges(Ownership.fromRanges([(5, 9), (0, 6), (12, 12)])) == [(0, 9), (12, 12)]
+    assert Ownership.toRanges(Ownership.fromRanges([])) == []
@@ -0,0 +1,36 @@
+import pytest
+
+from notobuilderCLI import GlyphLimitError, Notobuilder
+
+
+def planner(repoNames, lgcRepoNames, glyphLimit):
+    builder = Notobuilder.__new__(Notobuilder)
+    builder.repoNames = repoNames
+    builder.lgcRepoNames = lgcRepoNames
+    builder.glyphLimit = glyphLimit
+    return builder
+
+
+def test_onePart():
+    builder = planner(["NotoSans", "NotoSansTamil"], ["NotoSans"], 6000)
+    assert builder.planParts({"NotoSans": 1237, "NotoSansTamil": 3533}) == [["NotoSans", "NotoSansTamil"]]
+
+
+def test_split(capsys):
+    builder = planner(["NotoSans", "NotoSansTamil", "NotoSansNushu", "NotoSansArabic"], ["NotoSans"], 9000)
+    counts = {"NotoSans": 1237, "NotoSansTamil": 3533, "NotoSansNushu": 3718, "NotoSansArabic": 4921}
+    # the biggest first, Latin in every part, in the order of the scripts
+    assert builder.planParts(counts) == [
+        ["NotoSans", "NotoSansArabic"],
+        ["NotoSans", "NotoSansTamil", "NotoSansNushu"],
+        ]
+    assert "split in 2 families" in capsys.readouterr().out
+
+
+def test_tooBig():
+    builder = planner(["NotoSans", "NotoSansTamil", "NotoSansArabic"], ["NotoSans"], 6000)
+    with pytest.raises(GlyphLimitError, match="NotoSansArabic has 4921 glyphs, more than the 4763 a font can hold next to NotoSans"):
+        builder.planParts({"NotoSans": 1237, "NotoSansTamil": 3533, "NotoSansArabic": 4921})
+    builder = planner(["NotoSans", "NotoSansTamil"], ["NotoSans"], 1000)
+    with pytest.raises(GlyphLimitError, match="NotoSans have 1237 glyphs"):
+        builder.planParts({"NotoSans": 1237, "NotoSansTamil": 3533})
@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from notobuilderCLI import PresetIndex
+
+
+def writeJson(path, content):
+    with open(str(path), "w") as f:
+        json.dump(content, f)
+
+
+@pytest.fixture
+def subsets(tmp_path):
+    writeJson(tmp_path / "latin_subsets.json", {
+        "BasicLatin": ["A", "B", "space"],
+        "ExtendedLatin": ["A", "B", "space", "Aogonek"],
+        })
+    writeJson(tmp_path / "greek_subsets.json", {"BasicGreek": ["Alpha", "space"]})
+    return tmp_path
+
+
+def test_glyphs(subsets):
+    index = PresetIndex(str(subsets))
+    assert index.glyphs("latin_subsets.json", "BasicLatin") == frozenset(["A", "B", "space"])
+    assert index.glyphs("greek_subsets.json", "BasicGreek") == frozenset(["Alpha", "space"])
+    assert sorted(index.presets("latin_subsets.json")) == ["BasicLatin", "ExtendedLatin"]
+    assert index.presets("cyrillic_subsets.json") == []
+    with pytest.raises(FileNotFoundError):
+        index.glyphs("cyrillic_subsets.json", "BasicCyrillic")
+    assert os.path.exists(index.path)
+
+
+def test_reload(subsets, monkeypatch):
+    PresetIndex(str(subsets)).load()
+
+    def compile(self, sources):
+        raise AssertionError("the index should not be compiled again")
+
+    monkeypatch.setattr(PresetIndex, "compile", compile)
+    index = PresetIndex(str(subsets))
+    assert index.glyphs("latin_subsets.json", "ExtendedLatin") == frozenset(["A", "B", "space", "Aogonek"])
+
+
+def test_recompile(subsets):
+    PresetIndex(str(subsets)).load()
+    writeJson(subsets / "latin_subsets.json", {"BasicLatin": ["A", "B", "C", "space"]})
+    writeJson(subsets / "cyrillic_subsets.json", {"BasicCyrillic": ["afii10017"]})
+    index = PresetIndex(str(subsets))
+    assert index.glyphs("latin_subsets.json", "BasicLatin") == frozenset(["A", "B", "C", "space"])
+    assert index.presets("latin_subsets.json") == ["BasicLatin"]
+    assert index.glyphs("cyrillic_subsets.json", "BasicCyrillic") == frozenset(["afii10017"])
+    os.remove(str(subsets / "greek_subsets.json"))
+    assert PresetIndex(str(subsets)).presets("greek_subsets.json") == []
+
+
+def test_damaged(subsets):
+    index = PresetIndex(str(subsets))
+    index.load()
+    with open(index.path, "wb") as f:
+        f.write(b"garbage")
+    assert PresetIndex(str(subsets)).glyphs("greek_subsets.json", "BasicGreek") == frozenset(["Alpha", "space"])
+
+
+def test_repoSubsets():
+    # the presets shipped with the builder
+    folder = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "subsets")
+    index = PresetIndex(folder)
+    with open(os.path.join(folder, "latin_subsets.json"), "r") as f:
+        latin = json.load(f)
+    for preset, glyphs in latin.items():
+        assert index.glyphs("latin_subsets.json", preset) == frozenset(glyphs)
+
+
+def test_contentShas(subsets):
+    shas = PresetIndex(str(subsets)).contentShas()
+    assert sorted(shas) == ["greek_subsets.json", "latin_subsets.json"]
+    # the merge keys do not change with the mtimes of the presets
+    os.utime(str(subsets / "latin_subsets.json"), (0, 0))
+    assert PresetIndex(str(subsets)).contentShas() == shas
+    writeJson(subsets / "latin_subsets.json", {"BasicLatin": ["A", "space"]})
+    changed = PresetIndex(str(subsets)).contentShas()
+    assert changed["latin_subsets.json"] != shas["latin_subsets.json"]
+    assert changed["greek_subsets.json"] == shas["greek_subsets.json"]
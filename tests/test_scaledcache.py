@@ -0,0 +1,57 @@
+import os
+
+from fontTools import ttLib
+
+from notobuilderCLI import BlobStore, FontCache, FontIndex, ScaledCache
+
+
+def scaledCache(folder):
+    fontCache = FontCache()
+    fontIndex = FontIndex(str(folder / "NotoFonts"), fontCache)
+    return ScaledCache(str(folder / "NotoFonts"), fontIndex, fontCache)
+
+
+def test_scaled(makeFont, tmp_path):
+    ftpath = makeFont("NotoSansTamil-Regular.ttf", {0xB85: "a"}, upm=2048)
+    cache = scaledCache(tmp_path)
+    path = cache.get(ftpath)
+    assert os.path.basename(path) == "NotoSansTamil-Regular.ttf"
+    assert ttLib.TTFont(path)["head"].unitsPerEm == 1000
+    cache.fontIndex.close()
+
+
+def test_notHashedAgain(makeFont, tmp_path, monkeypatch):
+    ftpath = makeFont("NotoSansTamil-Regular.ttf", {0xB85: "a"}, upm=2048)
+    cache = scaledCache(tmp_path)
+    path = cache.get(ftpath)
+    sha = BlobStore.hashFile(path)
+    cache.fontIndex.close()
+    hashFile = BlobStore.hashFile
+    hashed = []
+
+    def hashAndCount(ftpath):
+        hashed.append(ftpath)
+        return hashFile(ftpath)
+
+    # the next run trusts the recorded SHA of the scaled copy
+    monkeypatch.setattr(BlobStore, "hashFile", staticmethod(hashAndCount))
+    cache = scaledCache(tmp_path)
+    assert cache.get(ftpath) == path
+    assert cache.fontIndex.sha(path) == sha
+    assert path not in hashed
+    cache.fontIndex.close()
+
+
+def test_modified(makeFont, tmp_path):
+    ftpath = makeFont("NotoSansTamil-Regular.ttf", {0xB85: "a"}, upm=2048)
+    cache = scaledCache(tmp_path)
+    path = cache.get(ftpath)
+    sha = BlobStore.hashFile(path)
+    cache.fontIndex.close()
+    with open(path, "ab") as f:
+        f.write(b"\0")
+    # made again
+    cache = scaledCache(tmp_path)
+    assert cache.get(ftpath) == path
+    assert BlobStore.hashFile(path) == sha
+    cache.fontIndex.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from notobuilderCLI import StyleIndex
+
+
+@pytest.mark.parametrize("ftname, key", [
+    ("NotoSans-Regular.ttf", ("NotoSans", "Normal", "Regular", False)),
+    ("NotoSans-Bold.ttf", ("NotoSans", "Normal", "Bold", False)),
+    ("NotoSans-Italic.ttf", ("NotoSans", "Normal", "Regular", True)),
+    ("NotoSans-RegularItalic.ttf", ("NotoSans", "Normal", "Regular", True)),
+    ("NotoSans-CondensedSemiBoldItalic.ttf", ("NotoSans", "Condensed", "SemiBold", True)),
+    ("NotoSans-SemiCondensed.ttf", ("NotoSans", "SemiCondensed", "Regular", False)),
+    ("NotoSans-ExtraCondensedBlack.ttf", ("NotoSans", "ExtraCondensed", "Black", False)),
+    ("NotoSansDisplay-ExtraCondensedThin.ttf", ("NotoSansDisplay", "ExtraCondensed", "Thin", False)),
+    ])
+def test_parse(ftname, key):
+    assert StyleIndex.parse(ftname) == key
+
+
+@pytest.mark.parametrize("ftname", ["NotoSans-Regular.otf", "NotoSans.ttf", "sha.md"])
+def test_parseOthers(ftname):
+    assert StyleIndex.parse(ftname) is None
+
+
+def test_find(tmp_path):
+    folder = tmp_path / "NotoSans" / "instance_ttf"
+    folder.mkdir(parents=True)
+    for ftname in ["NotoSans-Italic.ttf", "NotoSans-Bold.ttf", "NotoSans-CondensedBold.ttf"]:
+        (folder / ftname).write_bytes(b"")
+    (folder / "notes.txt").write_bytes(b"")
+    index = StyleIndex.fromCache(str(tmp_path), ["NotoSans", "NotoSerif"])
+    assert index.name("NotoSans", "/any/NotoSans-RegularItalic.ttf") == "NotoSans-Italic.ttf"
+    assert index.name("NotoSans", "NotoSans-Regular.ttf") is None
+    assert index.find("NotoSans", ["NotoSans-SemiBold.ttf", "NotoSans-Bold.ttf"]) == str(folder / "NotoSans-Bold.ttf")
+    assert index.find("NotoSans", ["NotoSans-Thin.ttf"]) is None
+    assert index.find("NotoSerif", ["NotoSerif-Bold.ttf"]) is None
+    assert sorted(index.styleNames("NotoSans")) == ["Bold", "CondensedBold", "Italic"]
@@ -0,0 +1,67 @@
+import multiprocessing
+import sqlite3
+import threading
+
+import pytest
+
+from notobuilderCLI import FontIndex, Notobuilder
+
+pytestmark = pytest.mark.skipif(
+    "fork" not in multiprocessing.get_all_start_methods(), reason="the styles are built in forked processes"
+    )
+
+
+class FakeIndex:
+    def close(self):
+        pass
+
+    def connect(self):
+        pass
+
+
+class FakeBuilder:
+    """ What Notobuilder.buildStyles uses of a builder: the style named
+        "Broken" fails after printing its log.
+    """
+
+    def __init__(self, styles):
+        self.wghtwdth_styles = styles
+        self.cache = False
+        self.coverage = False
+        self.jobs = 2
+        self.fontIndex = FakeIndex()
+
+    def buildStyle(self, style):
+        print("INFO: building " + style)
+        if style == "Broken":
+            raise ValueError(style + " failed")
+
+    def closeSubsetPool(self):
+        pass
+
+    def cacheCounters(self):
+        return [0] * 7
+
+    def addCacheCounters(self, counters):
+        pass
+
+
+def test_workerLog(capsys):
+    builder = FakeBuilder(["Regular", "Bold", "Broken", "Black"])
+    with pytest.raises(ValueError, match="Broken failed"):
+        Notobuilder.buildStyles(builder)
+    out = capsys.readouterr().out
+    # the log of the failed style is printed before its exception
+    assert out.splitlines() == ["INFO: building " + s for s in ["Regular", "Bold", "Broken"]]
+
+
+def test_busyDatabase(tmp_path):
+    fontIndex = FontIndex(str(tmp_path))
+    other = sqlite3.connect(fontIndex.path, check_same_thread=False)
+    other.execute("BEGIN EXCLUSIVE")
+    # another style holds the lock for a moment: this one waits for it
+    threading.Timer(0.5, other.rollback).start()
+    with fontIndex.db:
+        fontIndex.db.execute("DELETE FROM fonts")
+    other.close()
+    fontIndex.close()
@@ -0,0 +1,117 @@
+import gc
+import os
+import subprocess
+import sys
+
+import pytest
+from fontTools.feaLib.builder import addOpenTypeFeaturesFromString
+from fontTools.ttLib import TTFont
+
+from conftest import buildFont
+from notobuilderCLI import CachedMerger, FontCache, Notobuilder, RssMonitor
+
+measureScript = """
+import sys
+sys.path.insert(0, sys.argv[1])
+from notobuilderCLI import CachedMerger, FontCache, Notobuilder, RssMonitor
+budget, paths = int(sys.argv[2]), sys.argv[3:]
+builder = Notobuilder.__new__(Notobuilder)
+builder.fontCache, builder.memoryBudget = FontCache(), budget
+for path in paths:
+    builder.fontCache.data(path)
+with RssMonitor() as rss:
+    if budget == 0:
+        font = CachedMerger(builder.fontCache).merge(paths)
+    else:
+        font = builder.treeMerge(paths)
+    FontCache.compile(builder.normalizeLayout(font))
+print(rss.growth)
+"""
+
+
+def layoutFont(path, first, count):
+    """ A font of count glyphs from the codepoint first, with a ligature
+        and a kerning pair between each glyph and the next one.
+    """
+    cmap = {first + i: "u%04X" % (first + i) for i in range(count)}
+    buildFont(path, cmap)
+    font = TTFont(path)
+    names = sorted(cmap.values())
+    pairs = ["pos " + names[i] + " " + names[i + 1] + " " + str(-1 - i % 50) + ";" for i in range(count - 1)]
+    addOpenTypeFeaturesFromString(font, "\n".join([
+        "languagesystem DFLT dflt;",
+        "languagesystem latn dflt;",
+        "feature liga { sub " + names[0] + " " + names[1] + " by " + names[2] + "; } liga;",
+        "feature kern { " + " ".join(pairs) + " } kern;",
+        ]))
+    # without glyph names, as the subset fonts the builder merges
+    font["post"].formatType = 3.0
+    font.save(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def layoutFonts(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("layout")
+    return [layoutFont(str(folder / ("Font" + str(i) + ".ttf")), 0x1000 * (i + 1), 300) for i in range(4)]
+
+
+def treeBuilder(ftpaths):
+    """ A builder whose budget holds two of these fonts: they are merged
+        by pairs, then the pairs together.
+    """
+    builder = Notobuilder.__new__(Notobuilder)
+    builder.fontCache = FontCache()
+    cost = 2 * Notobuilder.decompiledRatio * os.path.getsize(ftpaths[0])
+    builder.memoryBudget = 2 * cost
+    return builder
+
+
+def test_sameTables(layoutFonts, capsys):
+    builder = treeBuilder(layoutFonts)
+    single = builder.normalizeLayout(CachedMerger(builder.fontCache).merge(layoutFonts))
+    tree = builder.normalizeLayout(builder.treeMerge(layoutFonts))
+    assert "merge 2 fonts at level 1" in capsys.readouterr().out
+    # Merger dates head with the current time
+    for font in [single, tree]:
+        font["head"].created = font["head"].modified = 0
+    single = FontCache.font(FontCache.compile(single), False)
+    tree = FontCache.font(FontCache.compile(tree), False)
+    assert single.getGlyphOrder() == tree.getGlyphOrder()
+    assert sorted(single.keys()) == sorted(tree.keys())
+    for tag in single.keys():
+        if tag != "GlyphOrder":
+            assert single.getTableData(tag) == tree.getTableData(tag), tag
+    # the features merged at each level are sorted
+    tags = [r.FeatureTag for r in tree["GPOS"].table.FeatureList.FeatureRecord]
+    assert tags == sorted(tags)
+
+
+def test_inputsReleased(layoutFonts):
+    builder = treeBuilder(layoutFonts)
+    gc.collect()
+    gc.disable()
+    try:
+        font = builder.treeMerge(layoutFonts)
+        # the merged inputs and intermediate fonts are freed by the merge
+        # itself, not by a later collection
+        alive = [o for o in gc.get_objects() if isinstance(o, TTFont)]
+    finally:
+        gc.enable()
+    assert alive == [font]
+    assert builder.fontCache.memory == dict()
+
+
+@pytest.mark.skipif(RssMonitor.current() is None, reason="no /proc/self/statm")
+def test_withinBudget(tmp_path):
+    ftpaths = [layoutFont(str(tmp_path / ("Font" + str(i) + ".ttf")), 0x1000 * (i + 1), 2000) for i in range(4)]
+    budget = treeBuilder(ftpaths).memoryBudget
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    growth = dict()
+    for mode in [0, budget]:
+        growth[mode] = int(subprocess.check_output(
+            [sys.executable, "-c", measureScript, root, str(mode)] + ftpaths, cwd=root
+            ).split()[-1])
+    # the last level merges everything: the merge by groups costs no
+    # more than a single merge
+    assert growth[budget] <= growth[0] * 1.1
@@ -0,0 +1,52 @@
+import pytest
+
+from notobuilderCLI import Ownership, UnicodeRanges
+
+
+def codepoints(expression):
+    return Ownership.toCodepoints(UnicodeRanges.parse(expression))
+
+
+def test_ranges():
+    assert codepoints("U+0041") == [0x41]
+    assert codepoints("U+0041-0043") == [0x41, 0x42, 0x43]
+    assert codepoints("u+41-U+43") == [0x41, 0x42, 0x43]
+    assert codepoints("U+1F600") == [0x1F600]
+
+
+def test_operators():
+    assert codepoints("U+0041-0043 + U+0061") == [0x41, 0x42, 0x43, 0x61]
+    assert codepoints("U+0041-0043 | U+0061") == [0x41, 0x42, 0x43, 0x61]
+    assert codepoints("U+0041-0043 - U+0042") == [0x41, 0x43]
+    assert codepoints("U+0041-0043 & U+0042-0050") == [0x42, 0x43]
+    # read from left to right
+    assert codepoints("U+0041-0043 - U+0042 + U+0042") == [0x41, 0x42, 0x43]
+    assert codepoints("U+0041-0043 + U+0042 - U+0042") == [0x41, 0x43]
+
+
+def test_presets():
+    assert UnicodeRanges.parse("BasicGreek") == Ownership.fromRanges([(0x370, 0x3FF)])
+    basicLatin = set(codepoints("BasicLatin"))
+    assert 0x41 in basicLatin and 0x20AC in basicLatin and 0x100 not in basicLatin
+    assert codepoints("BasicLatin & U+0000-007F") == list(range(0x20, 0x7F))
+
+
+def test_blocks():
+    assert codepoints("Tamil") == list(range(0xB80, 0xC00))
+    # block names are compared without case, spaces, _ and -
+    assert UnicodeRanges.parse("latin_extended-a") == UnicodeRanges.parse("LatinExtended-A")
+    assert codepoints("LatinExtended-A") == list(range(0x100, 0x180))
+
+
+def test_arguments():
+    assert UnicodeRanges.parse(["BasicGreek", "-", "U+0370"]) == UnicodeRanges.parse("BasicGreek - U+0370")
+
+
+@pytest.mark.parametrize("expression", ["", "BasicLatin +", "NotAPreset", "U+0041 * U+0042", "U+XYZ"])
+def test_errors(expression):
+    with pytest.raises(ValueError):
+        UnicodeRanges.parse(expression)
+
+
+def test_fromText():
+    assert UnicodeRanges.fromText("aba") == Ownership.fromRanges([(0x61, 0x62)])